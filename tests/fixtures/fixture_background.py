@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def drain_background_pool():
+    """Фоновый пул дописывает в базу до того, как её очистят."""
+    yield
+    from posts import thumbnails
+    thumbnails.drain()
@@ -0,0 +1,213 @@
+"""ASGI-обёртка над синхронным Django.
+
+Django 2.2 не умеет асинхронных представлений, поэтому сам запрос,
+как и под WSGI, обрабатывается в потоке. Цикл событий берёт на себя
+всё, что под WSGI держит поток впустую: чтение тела запроса
+от медленного клиента и отдачу ответа. Потоков два ограниченных пула:
+лёгкие читающие представления из ``ASGI_READ_VIEWS`` идут в свой пул
+и не стоят в очереди за медленными запросами вроде отправки письма
+при сбросе пароля, а остальное — в общий.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import Resolver404, get_resolver
+
+READ_METHODS = ('GET', 'HEAD')
+BODY_BUFFER = 64 * 1024
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class ASGIHandler:
+    """ASGI-приложение (протокол ASGI 3) поверх ``WSGIHandler``."""
+
+    def __init__(self):
+        self.wsgi = WSGIHandler()
+        self.read_pool = ThreadPoolExecutor(
+            max_workers=settings.ASGI_READ_WORKERS,
+            thread_name_prefix='asgi-read',
+        )
+        self.pool = ThreadPoolExecutor(
+            max_workers=settings.ASGI_WORKERS,
+            thread_name_prefix='asgi',
+        )
+        self.read_views = frozenset(settings.ASGI_READ_VIEWS)
+        # None в DATA_UPLOAD_MAX_MEMORY_SIZE снимает лимит тела.
+        self.max_body = None
+        if settings.DATA_UPLOAD_MAX_MEMORY_SIZE is not None:
+            self.max_body = (
+                settings.IMAGE_UPLOAD_MAX_BYTES
+                + settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+            )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.read_pool.shutdown(wait=True)
+                self.pool.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        try:
+            request_body = await self.read_body(receive)
+        except RequestTooLarge:
+            await send_status(send, 413)
+            return
+        if request_body is None:
+            return
+        loop = asyncio.get_running_loop()
+        pool = self.pool_for(scope)
+        with request_body:
+            status, headers, body = await loop.run_in_executor(
+                pool, self.run, build_environ(scope, request_body)
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        if isinstance(body, bytes):
+            await send({'type': 'http.response.body', 'body': body})
+        else:
+            await self.stream(loop, pool, body, send)
+
+    async def read_body(self, receive):
+        """Тело запроса во временном файле; ``None``, если клиент ушёл."""
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_BUFFER)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self.max_body is not None and size > self.max_body:
+                body.close()
+                raise RequestTooLarge
+            body.write(chunk)
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def pool_for(self, scope):
+        if scope['method'] not in READ_METHODS:
+            return self.pool
+        try:
+            match = get_resolver().resolve(scope['path'])
+        except Resolver404:
+            return self.pool
+        if match.view_name in self.read_views:
+            return self.read_pool
+        return self.pool
+
+    def run(self, environ):
+        """Обрабатывает запрос в потоке пула.
+
+        Обычный ответ читается и закрывается здесь же: ``close()``
+        шлёт ``request_finished``, а тот закрывает соединения с базой
+        именно этого потока.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi(environ, start_response)
+        if getattr(response, 'streaming', False):
+            return started['status'], started['headers'], response
+        try:
+            body = b''.join(response)
+        finally:
+            response.close()
+        return started['status'], started['headers'], body
+
+    async def stream(self, loop, pool, response, send):
+        """Отдаёт потоковый ответ, читая его по частям в пуле."""
+        chunks = iter(response)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(pool, next, chunks, None)
+                if chunk is None:
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            await send({'type': 'http.response.body'})
+        finally:
+            await loop.run_in_executor(pool, response.close)
+
+
+def build_environ(scope, body):
+    """WSGI-окружение из ASGI-области запроса."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+async def send_status(send, status):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body'})
+
+
+def get_asgi_application():
+    """Настраивает Django и возвращает ASGI-приложение."""
+    import django
+
+    django.setup(set_prefix=False)
+    return ASGIHandler()
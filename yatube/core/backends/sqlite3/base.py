@@ -0,0 +1,16 @@
+"""SQLite с настройками соединения из ``OPTIONS['pragmas']``.
+
+Прагмы применяются к каждому новому соединению: большинство из них,
+кроме ``journal_mode``, живут только до его закрытия.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn_params = dict(conn_params)
+        pragmas = conn_params.pop('pragmas', {})
+        connection = super().get_new_connection(conn_params)
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
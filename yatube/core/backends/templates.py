@@ -0,0 +1,22 @@
+"""Шаблоны Django с замером времени отрисовки для ``core.timing``.
+
+Замеряется только отрисовка шаблона целиком: вложенные ``include``
+и ``extends`` идут внутри неё и отдельно не считаются.
+"""
+from django.template.backends import django
+
+from core import timing
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        with timing.measure('tpl'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
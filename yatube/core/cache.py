@@ -0,0 +1,130 @@
+"""Защита кеша от лавины одновременных пересчётов.
+
+Значение пересчитывает только один запрос: внутри процесса его
+сторожит ``threading.Lock``, между процессами — ключ-замок,
+поставленный через атомарный ``cache.add``. Остальные получают
+устаревшее значение или недолго ждут свежего. Незадолго до истечения
+срока значение с растущей вероятностью пересчитывается заранее
+(алгоритм XFetch), поэтому записи не истекают у всех одновременно.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+
+from django.core.cache import cache as default_cache
+
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+POLL_INTERVAL = 0.05
+EARLY_REFRESH_BETA = 1.0
+
+_local_locks = weakref.WeakValueDictionary()
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(key):
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def _is_fresh(entry, beta):
+    _, _, expires_at, delta = entry
+    if beta:
+        return time.time() - delta * beta * math.log(
+            1 - random.random()
+        ) < expires_at
+    return time.time() < expires_at
+
+
+def _lookup(cache, key, version):
+    entry = cache.get(key)
+    if entry is not None and entry[1] == version:
+        return entry
+    return None
+
+
+def get_or_set(key, compute, timeout, version=None, cache=default_cache,
+               should_cache=None, stale_timeout=None,
+               beta=EARLY_REFRESH_BETA):
+    """``cache.get_or_set`` с единственным вычислителем.
+
+    Значение другой ``version`` считается недействительным: его не
+    отдают, а ждут свежее. Истёкшее по времени значение той же версии
+    ещё ``stale_timeout`` секунд (по умолчанию ``timeout``) отдаётся,
+    пока его пересчитывает другой запрос. ``should_cache`` решает,
+    стоит ли сохранять вычисленное значение.
+    """
+    entry = _lookup(cache, key, version)
+    if entry is not None and _is_fresh(entry, beta):
+        return entry[0]
+    local_lock = _local_lock(key)
+    if not local_lock.acquire(
+        blocking=entry is None, timeout=WAIT_TIMEOUT if entry is None else -1
+    ):
+        return entry[0] if entry is not None else compute()
+    try:
+        fresh = _lookup(cache, key, version)
+        refreshed = fresh is not None and (
+            entry is None or fresh[2] != entry[2]
+        )
+        if refreshed and _is_fresh(fresh, 0):
+            # Пока ждали замок, значение уже обновил другой поток.
+            return fresh[0]
+        lock_key, token = f'{key}:lock', uuid.uuid4().hex
+        if not cache.add(lock_key, token, LOCK_TIMEOUT):
+            if entry is not None:
+                return entry[0]
+            fresh = _wait(cache, key, version)
+            if fresh is not None:
+                return fresh[0]
+            return compute()
+        try:
+            return _compute_and_store(
+                cache, key, compute, timeout, version,
+                should_cache, stale_timeout
+            )
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+    finally:
+        local_lock.release()
+
+
+def _compute_and_store(cache, key, compute, timeout, version,
+                       should_cache, stale_timeout):
+    started = time.time()
+    value = compute()
+    if should_cache is None or should_cache(value):
+        delta = time.time() - started
+        if stale_timeout is None:
+            stale_timeout = timeout
+        cache.set(
+            key, (value, version, time.time() + timeout, delta),
+            timeout + stale_timeout
+        )
+    return value
+
+
+def _wait(cache, key, version):
+    """Ждёт значение, которое вычисляет другой процесс.
+
+    Замок снят, а значения нет — вычислитель упал или не стал
+    сохранять результат, и ждать больше нечего.
+    """
+    lock_key = f'{key}:lock'
+    deadline = time.time() + WAIT_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        found = cache.get_many([key, lock_key])
+        entry = found.get(key)
+        if entry is not None and entry[1] == version:
+            return entry
+        if lock_key not in found:
+            return None
+    return None
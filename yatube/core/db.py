@@ -0,0 +1,71 @@
+"""Повтор записей, которые упёрлись в блокировку SQLite.
+
+SQLite пускает одного писателя за раз. Соединение ждёт занятую базу
+``OPTIONS['timeout']`` секунд, но транзакция, которая сначала читала,
+а потом пишет, получает «database is locked» сразу, если за это время
+базу успел изменить другой писатель. Такую транзакцию остаётся только
+откатить и повторить целиком.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+LOCK_ERRORS = ('database is locked', 'database table is locked')
+
+
+def is_lock_error(error):
+    return str(error).startswith(LOCK_ERRORS)
+
+
+def backoff(attempt):
+    """Пауза перед повтором: экспонента с полным случайным разбросом.
+
+    Разброс разводит писателей, которые упёрлись в блокировку разом.
+    """
+    return random.uniform(0, min(
+        settings.DATABASE_LOCK_RETRY_DELAY * 2 ** attempt,
+        settings.DATABASE_LOCK_RETRY_MAX_DELAY,
+    ))
+
+
+def retry_on_lock(func):
+    """Выполняет ``func`` в транзакции и повторяет её при блокировке.
+
+    Внутри чужой транзакции повторять нечего: ``func`` вызывается
+    как есть, а ошибку обработает тот, кто транзакцию открыл.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if connection.in_atomic_block:
+            return func(*args, **kwargs)
+        for attempt in range(settings.DATABASE_LOCK_RETRIES + 1):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if (attempt == settings.DATABASE_LOCK_RETRIES
+                        or not is_lock_error(error)):
+                    raise
+            time.sleep(backoff(attempt))
+    return wrapper
+
+
+def save(instance, **kwargs):
+    """Сохраняет модель в транзакции с повтором при блокировке.
+
+    Перед повтором экземпляру возвращается состояние до неудачной
+    попытки: иначе новый объект, у которого откатили вставку, вторая
+    попытка сохранила бы как уже существующий.
+    """
+    adding, pk = instance._state.adding, instance.pk
+
+    @retry_on_lock
+    def attempt():
+        instance._state.adding = adding
+        instance.pk = pk
+        instance.save(**kwargs)
+
+    attempt()
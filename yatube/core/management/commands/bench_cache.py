@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SQLiteCache
+
+PAGE = 'x' * 20000
+
+
+def make_cache(backend, location):
+    if backend == 'locmem':
+        return LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    return SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def run_worker(backend, location, keys, operations):
+    """Один «воркер»: читает страницы и досчитывает промахи."""
+    cache = make_cache(backend, location)
+    hits = 0
+    started = time.perf_counter()
+    for i in range(operations):
+        key = f'page:{i % keys}'
+        if cache.get(key) is None:
+            cache.set(key, PAGE)
+        else:
+            hits += 1
+    return hits, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает общий SQLite-кеш с LocMemCache у нескольких воркеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--keys', type=int, default=200)
+        parser.add_argument('--operations', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        with tempfile.TemporaryDirectory() as directory:
+            location = os.path.join(directory, 'cache.sqlite3')
+            for backend in ('locmem', 'sqlite'):
+                self.bench(backend, location, workers, options)
+
+    def bench(self, backend, location, workers, options):
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(
+                run_worker,
+                [backend] * workers,
+                [location] * workers,
+                [options['keys']] * workers,
+                [options['operations']] * workers,
+            ))
+        total = workers * options['operations']
+        hits = sum(hits for hits, _ in results)
+        elapsed = max(elapsed for _, elapsed in results)
+        self.stdout.write(
+            f'{backend:>7}: {total / elapsed:10.0f} оп/с, '
+            f'попаданий {hits / total:6.1%} '
+            f'({workers} воркеров, {options["keys"]} ключей)'
+        )
@@ -0,0 +1,206 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import backoff, is_lock_error
+
+SCHEMA = '''
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    comments INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES post (id),
+    text TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX comment_post ON comment (post_id, created);
+'''
+SELECT_POST = 'SELECT text, comments FROM post WHERE id = ?'
+SELECT_COMMENTS = (
+    'SELECT text FROM comment WHERE post_id = ? ORDER BY created DESC '
+    'LIMIT 10'
+)
+INSERT_COMMENT = (
+    'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)'
+)
+UPDATE_POST = 'UPDATE post SET comments = comments + 1 WHERE id = ?'
+TEXT = 'Текст комментария ' * 10
+COMMENTS_PER_POST = 20
+PERCENTILES = (50, 99)
+
+
+def stock_profile():
+    """Как было: соединение на запрос, журнал по умолчанию, без повторов."""
+    return {'timeout': 5, 'pragmas': {}, 'persistent': False, 'retries': 0}
+
+
+def tuned_profile():
+    """Профиль из настроек проекта."""
+    database = settings.DATABASES['default']
+    options = dict(database['OPTIONS'])
+    return {
+        'timeout': options.pop('timeout', 5),
+        'pragmas': options.pop('pragmas', {}),
+        'persistent': bool(database.get('CONN_MAX_AGE')),
+        'retries': settings.DATABASE_LOCK_RETRIES,
+    }
+
+
+class Database:
+    def __init__(self, path, profile):
+        self.path = path
+        self.profile = profile
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(
+                self.path,
+                timeout=self.profile['timeout'],
+                isolation_level=None,
+            )
+            for name, value in self.profile['pragmas'].items():
+                self.connection.execute(f'PRAGMA {name} = {value}')
+        return self.connection
+
+    def finish_request(self):
+        if not self.profile['persistent'] and self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def read(connection, post_id):
+    """Страница поста: сам пост и последние комментарии."""
+    connection.execute(SELECT_POST, (post_id,)).fetchone()
+    connection.execute(SELECT_COMMENTS, (post_id,)).fetchall()
+
+
+def write(connection, post_id):
+    """Новый комментарий: пост читается до транзакции, как во вьюхе."""
+    connection.execute(SELECT_POST, (post_id,)).fetchone()
+    connection.execute('BEGIN')
+    try:
+        connection.execute(INSERT_COMMENT, (post_id, TEXT, time.time()))
+        connection.execute(UPDATE_POST, (post_id,))
+        connection.execute('COMMIT')
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+
+
+def with_retries(operation, database, post_id):
+    retries = database.profile['retries']
+    for attempt in range(retries + 1):
+        try:
+            return operation(database.connect(), post_id)
+        except sqlite3.OperationalError as error:
+            if attempt == retries or not is_lock_error(error):
+                raise
+        time.sleep(backoff(attempt))
+
+
+def run_worker(role, path, profile, posts, start, until):
+    """Один процесс сервера: запросы одной роли до истечения времени."""
+    operation = write if role == 'write' else read
+    database = Database(path, profile)
+    latencies, errors = [], 0
+    time.sleep(max(0, start - time.time()))
+    while time.time() < until:
+        started = time.perf_counter()
+        try:
+            with_retries(operation, database, random.randint(1, posts))
+        except sqlite3.OperationalError:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+        finally:
+            database.finish_request()
+    return role, latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает SQLite без настроек и с профилем из DATABASES '
+        '(WAL, прагмы, постоянные соединения, повтор при блокировке) '
+        'под параллельными чтениями и записями из нескольких процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for name, profile in (
+            ('stock', stock_profile()), ('tuned', tuned_profile())
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.seed(path, profile, options['posts'])
+                self.bench(name, path, profile, options)
+
+    def seed(self, path, profile, posts):
+        connection = Database(path, profile).connect()
+        connection.executescript(SCHEMA)
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT INTO post (id, text, comments) VALUES (?, ?, ?)',
+                ((pk, TEXT, COMMENTS_PER_POST) for pk in range(1, posts + 1))
+            )
+            connection.executemany(INSERT_COMMENT, (
+                (pk, TEXT, time.time())
+                for pk in range(1, posts + 1)
+                for _ in range(COMMENTS_PER_POST)
+            ))
+        connection.close()
+
+    def bench(self, name, path, profile, options):
+        roles = (
+            ['write'] * options['writers'] + ['read'] * options['readers']
+        )
+        start = time.time() + 1
+        until = start + options['seconds']
+        with ProcessPoolExecutor(len(roles)) as pool:
+            results = list(pool.map(
+                run_worker,
+                roles,
+                [path] * len(roles),
+                [profile] * len(roles),
+                [options['posts']] * len(roles),
+                [start] * len(roles),
+                [until] * len(roles),
+            ))
+        for role, label in (('write', 'запись'), ('read', 'чтение')):
+            latencies = sorted(
+                latency for result_role, role_latencies, _ in results
+                if result_role == role for latency in role_latencies
+            )
+            errors = sum(
+                errors for result_role, _, errors in results
+                if result_role == role
+            )
+            self.report(name, label, latencies, errors, options['seconds'])
+
+    def report(self, name, label, latencies, errors, seconds):
+        line = (
+            f'{name:>5} {label:>6}: {len(latencies) / seconds:8.0f} оп/с, '
+            f'ошибок {errors}'
+        )
+        if latencies:
+            line += ', ' + ', '.join(
+                f'p{p} {latencies[len(latencies) * p // 100] * 1000:.1f} мс'
+                for p in PERCENTILES
+            )
+        self.stdout.write(line)
@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+PERCENTILES = (50, 90, 99)
+SLOW_BODY = 1000
+SLOW_CHUNK = 10
+SLOW_INTERVAL = 0.5
+
+
+class Response:
+    def __init__(self, status, keep_alive):
+        self.status = status
+        self.keep_alive = keep_alive
+
+
+async def read_response(reader):
+    """Читает ответ HTTP/1.1 целиком; тело отбрасывается."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('соединение закрыто')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.read()
+        keep_alive = False
+    return Response(status, keep_alive)
+
+
+class Client:
+    """Клиент с постоянным соединением, как у браузера."""
+
+    def __init__(self, host, port, extra_headers):
+        self.host, self.port = host, port
+        self.extra_headers = extra_headers
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+            f'{self.extra_headers}\r\n'
+        )
+        self.writer.write(request.encode('latin1'))
+        try:
+            response = await read_response(self.reader)
+        except BaseException:
+            self.close()
+            raise
+        if not response.keep_alive:
+            self.close()
+        return response.status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def slow_client(host, port, path, done):
+    """Медленно шлёт тело POST-запроса, пока идёт основная нагрузка.
+
+    Так ведут себя мобильные клиенты на плохой связи: сервер, который
+    читает тело в рабочем потоке, держит этот поток всё это время.
+    """
+    while not done.is_set():
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(SLOW_INTERVAL)
+            continue
+        writer.write((
+            f'POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+            f'Content-Type: application/x-www-form-urlencoded\r\n'
+            f'Content-Length: {SLOW_BODY}\r\n\r\n'
+        ).encode('latin1'))
+        try:
+            for _ in range(SLOW_BODY // SLOW_CHUNK):
+                if done.is_set():
+                    break
+                writer.write(b'x' * SLOW_CHUNK)
+                await writer.drain()
+                await asyncio.sleep(SLOW_INTERVAL)
+            else:
+                await read_response(reader)
+        except (OSError, ValueError, IndexError,
+                asyncio.IncompleteReadError):
+            pass
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер GET-запросами с заданной '
+        'конкурентностью и печатает пропускную способность и задержки. '
+        'Годится для сравнения WSGI- и ASGI-развёртываний одного сайта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Адрес сервера, например '
+                                        'http://127.0.0.1:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь для запросов; можно повторять, пути чередуются.'
+        )
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Сколько соединений параллельно медленно шлют POST.'
+        )
+        parser.add_argument('--slow-path', default='/auth/login/')
+        parser.add_argument(
+            '--cookie', default='',
+            help='Cookie, например sessionid=…, для авторизованных страниц.'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Нужен адрес вида http://host:port')
+        paths = options['paths'] or ['/']
+        extra_headers = ''
+        if options['cookie']:
+            extra_headers = f'Cookie: {options["cookie"]}\r\n'
+        latencies, statuses, elapsed = asyncio.run(self.load(
+            url.hostname, url.port or 80, paths, extra_headers, options
+        ))
+        self.report(latencies, statuses, elapsed, options['concurrency'])
+
+    async def load(self, host, port, paths, extra_headers, options):
+        latencies, statuses = [], Counter()
+        counter = iter(range(options['requests']))
+
+        async def worker():
+            client = Client(host, port, extra_headers)
+            for number in counter:
+                path = paths[number % len(paths)]
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(
+                        client.get(path), options['timeout']
+                    )
+                except (OSError, ValueError, IndexError,
+                        asyncio.TimeoutError,
+                        asyncio.IncompleteReadError) as error:
+                    client.close()
+                    status = type(error).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+            client.close()
+
+        done = asyncio.Event()
+        slow = [
+            asyncio.ensure_future(
+                slow_client(host, port, options['slow_path'], done)
+            )
+            for _ in range(options['slow_clients'])
+        ]
+        if slow:
+            # Медленные клиенты должны успеть занять сервер.
+            await asyncio.sleep(SLOW_INTERVAL * 2)
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(worker() for _ in range(options['concurrency']))
+        )
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*slow)
+        return latencies, statuses, elapsed
+
+    def report(self, latencies, statuses, elapsed, concurrency):
+        latencies.sort()
+        ok = sum(
+            count for status, count in statuses.items()
+            if isinstance(status, int) and status < 400
+        )
+        self.stdout.write(
+            f'{len(latencies)} запросов за {elapsed:.1f} c, '
+            f'{concurrency} одновременно: '
+            f'{len(latencies) / elapsed:.0f} запр/с, успешных {ok}'
+        )
+        self.stdout.write('Ответы: ' + ', '.join(
+            f'{status}: {count}' for status, count in sorted(
+                statuses.items(), key=lambda item: str(item[0])
+            )
+        ))
+        if latencies:
+            self.stdout.write('Задержка, мс: ' + ', '.join(
+                f'p{p} {latencies[len(latencies) * p // 100] * 1000:.0f}'
+                for p in PERCENTILES
+            ) + f', max {latencies[-1] * 1000:.0f}')
@@ -0,0 +1,88 @@
+"""Чтение лент с реплик базы.
+
+Реплики перечислены в ``DATABASE_REPLICAS``. На них уходят только
+чтения моделей из ``DATABASE_REPLICA_APPS`` и только внутри
+представлений с ``read_from_replica``; всё остальное, в том числе
+пользователи и сессии, читается с основной базы. Реплика отстаёт
+от основной базы не больше чем на ``DATABASE_REPLICA_LAG`` секунд:
+столько после своей записи сессия читает с основной базы, чтобы
+увидеть написанное.
+"""
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+PIN_SESSION_KEY = '_primary_until'
+
+_state = threading.local()
+
+
+def pinned(request):
+    """Пишет ли сессия недавно и должна ли читать с основной базы."""
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > (
+        time.time()
+    )
+
+
+def read_from_replica(fresh=None):
+    """Направляет чтения представления на реплику.
+
+    ``fresh`` получает запрос и именованные аргументы представления
+    и говорит, успела ли реплика получить последние изменения,
+    от которых зависит страница.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not settings.DATABASE_REPLICAS or pinned(request)
+                    or fresh is not None and not fresh(request, **kwargs)):
+                return view(request, *args, **kwargs)
+            previous = getattr(_state, 'replica', None)
+            _state.replica = random.choice(settings.DATABASE_REPLICAS)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _state.replica = previous
+        return wrapper
+    return decorator
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if (replica is not None
+                and model._meta.app_label in settings.DATABASE_REPLICA_APPS):
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in settings.DATABASE_REPLICA_APPS:
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Все базы — копии основной, объекты из них можно связывать.
+        if {obj1._state.db, obj2._state.db} <= set(settings.DATABASES):
+            return True
+        return None
+
+
+class PinPrimaryMiddleware:
+    """Закрепляет сессию за основной базой после записи в ней."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        response = self.get_response(request)
+        if (_state.wrote and settings.DATABASE_REPLICAS
+                and hasattr(request, 'session')):
+            request.session[PIN_SESSION_KEY] = (
+                time.time() + settings.DATABASE_REPLICA_LAG
+            )
+        return response
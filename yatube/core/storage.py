@@ -0,0 +1,56 @@
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+SHARD_NAME = re.compile(r'^[0-9a-f]{2}$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы с именами по SHA-256 содержимого в двухуровневых каталогах.
+
+    ``posts/photo.jpg`` сохраняется как ``posts/ab/cd/abcd….jpg``,
+    так что в одном каталоге не скапливаются сотни тысяч файлов.
+    Одинаковое содержимое записывается один раз: повторная загрузка
+    только обновляет время изменения файла, чтобы сборщик мусора
+    не удалил его, пока на него ещё не сослались.
+    """
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+    @staticmethod
+    def content_name(name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), digest[:2], digest[2:4], digest + extension
+        )
+
+    def is_content_name(self, name):
+        parts = name.split('/')
+        return (
+            len(parts) >= 3
+            and all(SHARD_NAME.match(part) for part in parts[-3:-1])
+            and parts[-1].startswith(parts[-3] + parts[-2])
+        )
+
+    def shard_files(self, directory):
+        """Имена всех файлов в шардах каталога ``directory``."""
+        shards, _ = self.listdir(directory)
+        for first in filter(SHARD_NAME.match, shards):
+            seconds, _ = self.listdir(os.path.join(directory, first))
+            for second in filter(SHARD_NAME.match, seconds):
+                path = os.path.join(directory, first, second)
+                for name in self.listdir(path)[1]:
+                    yield os.path.join(path, name)
@@ -0,0 +1,112 @@
+import asyncio
+import io
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.asgi import ASGIHandler, build_environ
+
+
+def request(handler, method, path, body=b'', headers=(), query=b''):
+    """Прогоняет запрос через ASGI-приложение, как это делает сервер."""
+    messages = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query,
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    asyncio.run(handler(scope, receive, send))
+    start, *bodies = sent
+    return start, b''.join(message.get('body', b'') for message in bodies)
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.handler = ASGIHandler()
+
+    def tearDown(self):
+        self.handler.read_pool.shutdown()
+        self.handler.pool.shutdown()
+
+    def test_read_views_use_own_pool(self):
+        """Читающие ленты идут в отдельный пул, остальное — в общий."""
+        handler = self.handler
+        cases = (
+            ('GET', reverse('posts:index'), handler.read_pool),
+            ('HEAD', reverse('posts:profile', args=['user']),
+             handler.read_pool),
+            ('POST', reverse('posts:index'), handler.pool),
+            ('GET', reverse('about:author'), handler.pool),
+            ('GET', '/missing/page/', handler.pool),
+        )
+        for method, path, pool in cases:
+            with self.subTest(method=method, path=path):
+                self.assertIs(
+                    handler.pool_for({'method': method, 'path': path}), pool
+                )
+
+    def test_serves_django_response(self):
+        """Страница отдаётся с заголовками и телом ответа Django."""
+        start, body = request(
+            self.handler, 'GET', reverse('about:author'), query=b'x=1'
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), start['headers']
+        )
+        self.assertIn('Об авторе'.encode(), body)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=10,
+                       DATA_UPLOAD_MAX_MEMORY_SIZE=10)
+    def test_too_large_body(self):
+        """Слишком большое тело отклоняется без запуска Django."""
+        handler = ASGIHandler()
+        self.addCleanup(handler.pool.shutdown)
+        self.addCleanup(handler.read_pool.shutdown)
+        start, _ = request(handler, 'POST', '/', body=b'x' * 21)
+        self.assertEqual(start['status'], 413)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=None)
+    def test_body_without_limit(self):
+        """Без лимита обычных полей тело запроса не ограничивается."""
+        handler = ASGIHandler()
+        self.addCleanup(handler.pool.shutdown)
+        self.addCleanup(handler.read_pool.shutdown)
+        self.assertIsNone(handler.max_body)
+        start, _ = request(
+            handler, 'POST', reverse('about:author'), body=b'x' * 100
+        )
+        self.assertEqual(start['status'], 200)
+
+    def test_environ(self):
+        """Заголовки, cookie и путь переводятся в WSGI-окружение."""
+        environ = build_environ({
+            'method': 'POST',
+            'path': '/tag/кот/',
+            'query_string': b'q=1',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+                (b'cookie', b'a=1'),
+                (b'cookie', b'b=2'),
+            ],
+        }, io.BytesIO())
+        self.assertEqual(environ['PATH_INFO'].encode('latin1').decode(),
+                         '/tag/кот/')
+        self.assertEqual(environ['QUERY_STRING'], 'q=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
@@ -0,0 +1,106 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core import cache as single_flight
+
+KEY = 'test:single-flight'
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи вычисляют значение один раз."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                single_flight.get_or_set(KEY, compute, 60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока значение пересчитывают, остальным отдаётся старое."""
+        cache.set(KEY, ('stale', None, time.time() - 1, 0), 60)
+        cache.add(f'{KEY}:lock', 'other', 60)
+        value = single_flight.get_or_set(KEY, lambda: 'fresh', 60)
+        self.assertEqual(value, 'stale')
+
+    def test_waiter_stops_when_lock_released(self):
+        """Другой процесс не сохранил значение — ждущий считает сам."""
+        def uncacheable():
+            time.sleep(0.2)
+            return 'skip'
+
+        def failing():
+            time.sleep(0.2)
+            raise LookupError
+
+        for compute in (uncacheable, failing):
+            with self.subTest(compute=compute.__name__):
+                cache.clear()
+                # Свой замок у каждого вызова: как в разных процессах.
+                with mock.patch.object(
+                    single_flight, '_local_lock',
+                    side_effect=lambda key: threading.Lock()
+                ):
+                    other = threading.Thread(
+                        target=self.get_or_ignore, args=(compute,)
+                    )
+                    other.start()
+                    time.sleep(0.05)
+                    started = time.time()
+                    value = single_flight.get_or_set(
+                        KEY, lambda: 'fresh', 60,
+                        should_cache=lambda value: value != 'skip'
+                    )
+                    other.join()
+                self.assertEqual(value, 'fresh')
+                self.assertLess(
+                    time.time() - started, single_flight.WAIT_TIMEOUT / 2
+                )
+
+    def get_or_ignore(self, compute):
+        try:
+            single_flight.get_or_set(
+                KEY, compute, 60, should_cache=lambda value: value != 'skip'
+            )
+        except LookupError:
+            pass
+
+    def test_other_version_is_not_served(self):
+        """Значение другой версии не отдаётся даже как устаревшее."""
+        single_flight.get_or_set(KEY, lambda: 'old', 60, version=1)
+        value = single_flight.get_or_set(KEY, lambda: 'new', 60, version=2)
+        self.assertEqual(value, 'new')
+
+    def test_should_cache(self):
+        """Отклонённое should_cache значение не сохраняется."""
+        single_flight.get_or_set(
+            KEY, lambda: 'skip', 60, should_cache=lambda value: False
+        )
+        self.assertIsNone(cache.get(KEY))
+
+    def test_early_refresh(self):
+        """Близкое к истечению значение пересчитывается заранее."""
+        cache.set(KEY, (['old'], None, time.time() + 1, 1000), 60)
+        value = single_flight.get_or_set(KEY, lambda: ['new'], 60)
+        self.assertEqual(value, ['new'])
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.db import OperationalError, connection, transaction
+from django.db.models.signals import post_save
+from django.test import TransactionTestCase, override_settings
+
+from core import db
+from core.db import retry_on_lock
+from posts.models import Group
+
+
+class SQLiteProfileTests(TransactionTestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_on_connect(self):
+        """Прагмы из настроек применяются к соединению."""
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -16 * 1024)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+
+@override_settings(DATABASE_LOCK_RETRIES=2)
+@mock.patch('core.db.time.sleep')
+class RetryOnLockTests(TransactionTestCase):
+    def locked_once(self, error='database is locked'):
+        calls = []
+
+        @retry_on_lock
+        def create():
+            calls.append(Group.objects.create(slug=f'g{len(calls)}'))
+            if len(calls) == 1:
+                raise OperationalError(error)
+            return len(calls)
+
+        return create, calls
+
+    def test_retries_whole_transaction(self, sleep):
+        """При блокировке транзакция откатывается и повторяется."""
+        create, calls = self.locked_once()
+        self.assertEqual(create(), 2)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['g1']
+        )
+
+    def test_gives_up(self, sleep):
+        """Исчерпав повторы, ошибка блокировки уходит наверх."""
+        @retry_on_lock
+        def locked():
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            locked()
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_other_errors_and_outer_transaction(self, sleep):
+        """Прочие ошибки и блокировки в чужой транзакции не повторяются."""
+        create, _ = self.locked_once('no such table: x')
+        with self.assertRaises(OperationalError):
+            create()
+        create, _ = self.locked_once()
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                create()
+        sleep.assert_not_called()
+
+    def test_save_retries_insert(self, sleep):
+        """Повтор сохранения нового объекта снова вставляет его."""
+        created = []
+
+        def locked_once(sender, instance, **kwargs):
+            created.append(kwargs['created'])
+            if len(created) == 1:
+                raise OperationalError('database is locked')
+
+        post_save.connect(locked_once, sender=Group)
+        try:
+            db.save(Group(slug='g'))
+        finally:
+            post_save.disconnect(locked_once, sender=Group)
+        self.assertEqual(created, [True, True])
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['g']
+        )
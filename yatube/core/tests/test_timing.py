@@ -0,0 +1,59 @@
+import logging
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import timing
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Текст поста')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_header_and_log_line(self):
+        """Ответ несёт разбивку времени, она же уходит строкой в лог."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        self.assertTrue(header.startswith('total;dur='))
+        self.assertIn('db;dur=', header)
+        self.assertRegex(
+            header, r'cache;dur=[\d.]+;desc="\d+ hits, \d+ misses"'
+        )
+        self.assertIn('tpl;dur=', header)
+        record = logs.records[-1]
+        self.assertEqual(record.timing['view'], 'posts:index')
+        self.assertEqual(record.timing['status'], 200)
+        self.assertGreater(record.timing['db_count'], 0)
+        self.assertIn('view=posts:index ', record.getMessage())
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(logs.records[-1].timing['db_count'], 0)
+        self.assertGreater(logs.records[-1].timing['cache_hits'], 0)
+
+    def test_log_line_skipped_when_disabled(self):
+        """Без включённого лога строка для него не собирается."""
+        self.addCleanup(timing.logger.setLevel, timing.logger.level)
+        timing.logger.setLevel(logging.WARNING)
+        with mock.patch.object(timing.ServerTimingMiddleware, 'log') as log:
+            response = self.client.get(reverse('posts:index'))
+        self.assertIn('Server-Timing', response)
+        log.assert_not_called()
+
+    def test_no_timings_outside_request(self):
+        """Вне запроса замеры ничего не копят."""
+        with timing.measure('db'):
+            Post.objects.count()
+        timing.count('cache_hit')
+        self.assertIsNone(timing.current())
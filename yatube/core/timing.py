@@ -0,0 +1,138 @@
+"""Разбивка времени запроса по SQL, кешу, шаблонам и миниатюрам.
+
+``ServerTimingMiddleware`` собирает замеры одного запроса и отдаёт их
+в заголовке ``Server-Timing`` — его показывают инструменты
+разработчика в браузере — и строкой ``ключ=значение`` в лог
+``core.timing``. Замер — пара вызовов ``perf_counter`` на операцию,
+вне запроса он ничего не делает, так что замеры можно не выключать
+в бою. Время шаблонов и миниатюр включает SQL и кеш внутри них.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+# Метрики заголовка: имя, подпись к числу операций.
+METRICS = (
+    ('db', 'queries'),
+    ('cache', 'lookups'),
+    ('tpl', 'renders'),
+    ('thumb', 'lookups'),
+)
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+class Timings:
+    """Замеры одного запроса: время в секундах и число операций."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, name, seconds, count=1):
+        self.durations[name] += seconds
+        self.counts[name] += count
+
+    def header(self, total):
+        metrics = [f'total;dur={total * 1000:.1f}']
+        for name, unit in METRICS:
+            if name in self.counts:
+                metrics.append(
+                    f'{name};dur={self.durations[name] * 1000:.1f};'
+                    f'desc="{self.describe(name, unit)}"'
+                )
+        return ', '.join(metrics)
+
+    def describe(self, name, unit):
+        if name == 'cache':
+            return (
+                f'{self.counts["cache_hit"]} hits, '
+                f'{self.counts["cache_miss"]} misses'
+            )
+        return f'{self.counts[name]} {unit}'
+
+    def fields(self, total):
+        fields = {'total_ms': round(total * 1000, 1)}
+        for name, _ in METRICS:
+            fields[f'{name}_ms'] = round(self.durations[name] * 1000, 1)
+            fields[f'{name}_count'] = self.counts[name]
+        fields['cache_hits'] = self.counts['cache_hit']
+        fields['cache_misses'] = self.counts['cache_miss']
+        return fields
+
+
+def current():
+    """Замеры текущего запроса или ``None`` вне запроса."""
+    return getattr(_state, 'timings', None)
+
+
+@contextmanager
+def measure(name):
+    """Добавляет время блока к метрике ``name`` текущего запроса."""
+    timings = current()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def count(name, value=1):
+    """Увеличивает счётчик ``name`` текущего запроса без замера времени."""
+    timings = current()
+    if timings is not None and value:
+        timings.add(name, 0, value)
+
+
+def timed_execute(execute, sql, params, many, context):
+    """Обёртка выполнения SQL: время и число запросов."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        _state.timings.add('db', time.perf_counter() - started)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _state.timings = Timings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(timed_execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _state.timings = None
+        total = time.perf_counter() - started
+        response['Server-Timing'] = timings.header(total)
+        if logger.isEnabledFor(logging.INFO):
+            self.log(request, response, timings, total)
+        return response
+
+    def log(self, request, response, timings, total):
+        match = request.resolver_match
+        fields = {
+            'view': match.view_name if match else '-',
+            'method': request.method,
+            'status': response.status_code,
+            **timings.fields(total),
+        }
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
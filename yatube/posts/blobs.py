@@ -0,0 +1,101 @@
+"""Учёт ссылок на файлы картинок в хранилище по содержимому.
+
+Одинаковые загрузки хранятся одним файлом, поэтому удалять его можно,
+только когда на него не ссылается ни один пост. Число ссылок ведут
+сигналы постов, а файлы без ссылок удаляет сборщик мусора, выждав
+``grace`` на случай, если то же содержимое как раз загружают снова.
+"""
+import os
+from datetime import datetime
+
+from django.db.models import Count, F
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from . import images
+from .models import ImageBlob, Post
+
+UPLOAD_TO = Post.image.field.upload_to
+storage = Post.image.field.storage
+
+
+def acquire(name):
+    """Добавляет ссылку на файл."""
+    if not name:
+        return
+    updated = ImageBlob.objects.filter(name=name).update(
+        refs=F('refs') + 1, updated=timezone.now()
+    )
+    if updated:
+        return
+    _, created = ImageBlob.objects.get_or_create(
+        name=name, defaults={'refs': 1}
+    )
+    if not created:
+        acquire(name)
+
+
+def release(name):
+    """Убирает ссылку на файл; сам файл удалит сборщик мусора."""
+    if name:
+        ImageBlob.objects.filter(name=name, refs__gt=0).update(
+            refs=F('refs') - 1, updated=timezone.now()
+        )
+
+
+def recount():
+    """Пересчитывает ссылки по таблице постов."""
+    refs = dict(
+        Post.objects.exclude(image='').values_list('image').annotate(
+            Count('pk')
+        ).order_by()
+    )
+    for blob in ImageBlob.objects.iterator():
+        count = refs.pop(blob.name, 0)
+        if blob.refs != count:
+            ImageBlob.objects.filter(pk=blob.pk).update(refs=count)
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, refs=count) for name, count in refs.items()],
+        ignore_conflicts=True,
+    )
+
+
+def _modified(name):
+    return datetime.fromtimestamp(
+        os.path.getmtime(storage.path(name)), timezone.utc
+    )
+
+
+def _unused(name, deadline):
+    if Post.objects.filter(image=name).exists():
+        return False
+    return not storage.exists(name) or _modified(name) < deadline
+
+
+def collect(grace, dry_run=False):
+    """Удаляет файлы без ссылок, не менявшиеся дольше ``grace``.
+
+    Возвращает имена удалённых файлов. Кроме учтённых файлов с нулём
+    ссылок удаляются и неучтённые файлы в шардах, например от
+    загрузок, чья транзакция откатилась. Вместе с картинкой удаляются
+    её миниатюры и адаптивные варианты.
+    """
+    deadline = timezone.now() - grace
+    names = set(ImageBlob.objects.filter(
+        refs=0, updated__lt=deadline
+    ).values_list('name', flat=True))
+    if storage.exists(UPLOAD_TO):
+        known = set(ImageBlob.objects.values_list('name', flat=True))
+        names.update(
+            name for name in storage.shard_files(UPLOAD_TO)
+            if name not in known
+        )
+    removed = [name for name in sorted(names) if _unused(name, deadline)]
+    if not dry_run:
+        for name in removed:
+            if storage.exists(name):
+                delete_with_thumbnails(ImageFile(name, storage))
+            images.delete_variants(name)
+            ImageBlob.objects.filter(name=name, refs=0).delete()
+    return removed
@@ -0,0 +1,174 @@
+"""Кеш страниц лент с версионными ключами.
+
+Каждая страница зависит от набора областей (``index``, ``users``,
+``group:<slug>``, ``author:<username>``). Версии областей хранятся
+в кеше и увеличиваются сигналами моделей, поэтому устаревшие записи
+просто перестают читаться и вытесняются, а TTL может быть долгим.
+"""
+import time
+from copy import copy
+from functools import wraps
+from hashlib import md5
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import cache as single_flight
+
+VERSION_KEY = 'posts:version:{}'
+CHANGED_KEY = 'posts:changed:{}'
+USER_FRAGMENT_START = '<!-- user-fragment -->'
+USER_FRAGMENT_END = '<!-- /user-fragment -->'
+USER_FRAGMENT = '<!-- user-fragment:cached -->'
+USER_FRAGMENT_TEMPLATE = 'includes/header.html'
+
+
+def _initial_version():
+    # Версия, потерянная при вытеснении, не должна повториться.
+    return int(time.time() * 1000000)
+
+
+def get_versions(scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {
+        key: _initial_version() for key in keys if key not in versions
+    }
+    for key, version in missing.items():
+        cache.add(key, version, None)
+    if missing:
+        versions.update(cache.get_many(list(missing)))
+    return [versions.get(key, missing.get(key)) for key in keys]
+
+
+def bump(*scopes):
+    """Делает устаревшими страницы, зависящие от областей."""
+    for scope in set(scopes):
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+    if settings.DATABASE_REPLICAS:
+        cache.set_many(
+            {CHANGED_KEY.format(scope): True for scope in scopes},
+            settings.DATABASE_REPLICA_LAG,
+        )
+
+
+def settled(scopes):
+    """Проверка для ``read_from_replica``: области давно не менялись.
+
+    Страницу, собранную с отстающей реплики сразу после изменения,
+    кеш и ETag сохранили бы под новой версией, поэтому такие страницы
+    собираются с основной базы.
+    """
+    def fresh(request, **kwargs):
+        return not cache.get_many([
+            CHANGED_KEY.format(scope) for scope in scopes(request, **kwargs)
+        ])
+    return fresh
+
+
+def cache_page_versioned(timeout, scopes, audience=None):
+    """Кеширует первую страницу представления до смены версий.
+
+    ``scopes`` получает запрос и именованные аргументы представления
+    и возвращает области, от которых зависит страница. Страница
+    хранится отдельно для анонимов и для авторизованных; у последних
+    шапка с именем пользователя вырезается и отрисовывается заново
+    на каждый запрос. ``audience`` уточняет аудиторию, если тело
+    страницы зависит от пользователя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.GET:
+                return view(request, *args, **kwargs)
+            group = _audience_group(request, audience, kwargs)
+            cache_key = 'posts:page:{}:{}:{}'.format(
+                view.__name__, group, md5(request.path.encode()).hexdigest()
+            )
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                if not _is_cacheable(request, response):
+                    return response, False
+                if group != 'anon':
+                    stripped = _without_user_fragment(response)
+                    if stripped is None:
+                        return response, False
+                    response = stripped
+                return response, True
+
+            response, _ = single_flight.get_or_set(
+                cache_key, compute, timeout,
+                version='.'.join(map(str, get_versions(
+                    scopes(request, **kwargs)
+                ))),
+                should_cache=itemgetter(1),
+            )
+            if group != 'anon':
+                _fill_user_fragment(request, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def _audience_group(request, audience, kwargs):
+    if not request.user.is_authenticated:
+        return 'anon'
+    if audience is None:
+        return 'auth'
+    return f'auth:{audience(request, **kwargs)}'
+
+
+def _without_user_fragment(response):
+    content = response.content.decode(response.charset)
+    head, found, rest = content.partition(USER_FRAGMENT_START)
+    _, found_end, tail = rest.partition(USER_FRAGMENT_END)
+    if not (found and found_end):
+        return None
+    stored = copy(response)
+    stored.content = head + USER_FRAGMENT + tail
+    return stored
+
+
+def _fill_user_fragment(request, response):
+    if USER_FRAGMENT.encode() not in response.content:
+        return
+    header = render_to_string(USER_FRAGMENT_TEMPLATE, request=request)
+    response.content = response.content.decode(response.charset).replace(
+        USER_FRAGMENT, header, 1
+    )
+
+
+def _is_cacheable(request, response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if request.META.get('CSRF_COOKIE_USED'):
+        return False
+    return not response.cookies and 'private' not in response.get(
+        'Cache-Control', ()
+    )
+
+
+def versions_etag(scopes):
+    """Функция ETag для ``condition``: считается по версиям областей.
+
+    Версии лежат в кеше, поэтому ответ 304 обходится без запросов
+    к базе, построения страниц и шаблонов. В ETag входят также адрес
+    с параметрами, пользователь и CSRF-cookie, которые видны на
+    странице.
+    """
+    def etag(request, *args, **kwargs):
+        parts = [
+            request.get_full_path(),
+            str(request.user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            *map(str, get_versions(scopes(request, **kwargs))),
+        ]
+        return md5('|'.join(parts).encode()).hexdigest()
+    return etag
@@ -0,0 +1,143 @@
+"""Лёгкие записи постов для карточек в лентах.
+
+Карточке нужны начало текста, картинка с её размерами, имя автора
+и группа. Вместо
+экземпляров ``Post``, ``User`` и ``Group`` со всеми полями лента
+выбирает через ``values()`` только эти столбцы, обрезает текст ещё
+в запросе и раскладывает строки в записи со ``__slots__``.
+"""
+import json
+
+from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Substr
+
+from yatube.settings import EXCERPT_LENGTH
+
+from .models import Post
+from .utils import paginator
+
+FIELDS = (
+    'pk',
+    'pub_date',
+    'image',
+    'image_width',
+    'image_height',
+    'image_color',
+    'image_blurhash',
+    'image_variants',
+    'author_id',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group_id',
+    'group__slug',
+    'group__title',
+)
+
+
+class AuthorCard:
+    __slots__ = ('pk', 'username', 'first_name', 'last_name')
+
+    def __init__(self, pk, username, first_name, last_name):
+        self.pk = pk
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def __str__(self):
+        return self.username
+
+
+class GroupCard:
+    __slots__ = ('pk', 'slug', 'title')
+
+    def __init__(self, pk, slug, title):
+        self.pk = pk
+        self.slug = slug
+        self.title = title
+
+    def __str__(self):
+        return self.title
+
+
+class PostCard:
+    """Пост в ленте: равен посту с тем же ключом."""
+    __slots__ = (
+        'pk', 'pub_date', 'excerpt', 'truncated', 'image_name',
+        'image_width', 'image_height', 'image_color', 'image_blurhash',
+        'image_variants', 'author', 'group',
+    )
+
+    @classmethod
+    def from_row(cls, row):
+        card = cls()
+        card.pk = row['pk']
+        card.pub_date = row['pub_date']
+        card.excerpt = row['excerpt']
+        card.truncated = len(card.excerpt) > EXCERPT_LENGTH
+        if card.truncated:
+            # Не рвём последнее слово, если оно не длиннее выдержки.
+            # В выдержке из одних пробелов слов нет: режем как есть.
+            excerpt = card.excerpt[:EXCERPT_LENGTH]
+            words = excerpt.rsplit(None, 1)
+            card.excerpt = words[0] if words else excerpt
+        card.image_name = row['image']
+        card.image_width = row['image_width']
+        card.image_height = row['image_height']
+        card.image_color = row['image_color']
+        card.image_blurhash = row['image_blurhash']
+        card.image_variants = row['image_variants']
+        card.author = AuthorCard(
+            row['author_id'], row['author__username'],
+            row['author__first_name'], row['author__last_name'],
+        )
+        card.group = None
+        if row['group_id'] is not None:
+            card.group = GroupCard(
+                row['group_id'], row['group__slug'], row['group__title']
+            )
+        return card
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def image(self):
+        return FieldFile(None, Post.image.field, self.image_name)
+
+    @property
+    def variants(self):
+        return json.loads(self.image_variants) if self.image_variants else {}
+
+    def __eq__(self, other):
+        if isinstance(other, (PostCard, Post)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __repr__(self):
+        return f'<PostCard: {self.pk}>'
+
+
+def values(queryset, keys):
+    """Строки карточек с ключами постраничного вывода."""
+    return queryset.values(
+        *FIELDS,
+        *(key for key in keys if key not in FIELDS),
+        excerpt=Substr('text', 1, EXCERPT_LENGTH + 1),
+    )
+
+
+def card_paginator(request, queryset, keys=('pub_date', 'pk'),
+                   counter=None, counted=None):
+    """Страница ленты из карточек вместо постов."""
+    return paginator(
+        request, values(queryset, keys), keys,
+        record=PostCard.from_row, counter=counter, counted=counted,
+    )
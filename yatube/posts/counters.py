@@ -0,0 +1,106 @@
+from django.db.models import Count, F
+
+from .models import AuthorCounter, FeedItem, Group, Post, SiteCounter, User
+
+POSTS_TOTAL = 'posts'
+
+
+def bump_author(author_id, delta):
+    """Сдвигает счётчик постов автора на delta."""
+    updated = AuthorCounter.objects.filter(author_id=author_id).update(
+        posts_count=F('posts_count') + delta
+    )
+    if updated or delta < 0:
+        return
+    _, created = AuthorCounter.objects.get_or_create(
+        author_id=author_id, defaults={'posts_count': delta}
+    )
+    if not created:
+        bump_author(author_id, delta)
+
+
+def bump_group(group_id, delta):
+    """Сдвигает счётчик постов группы на delta."""
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def bump_total(delta):
+    """Сдвигает счётчик всех постов на delta."""
+    updated = SiteCounter.objects.filter(name=POSTS_TOTAL).update(
+        value=F('value') + delta
+    )
+    if updated or delta < 0:
+        return
+    _, created = SiteCounter.objects.get_or_create(
+        name=POSTS_TOTAL, defaults={'value': delta}
+    )
+    if not created:
+        bump_total(delta)
+
+
+def bump_feeds(user_ids, delta):
+    """Сдвигает счётчики лент пользователей на delta одним UPDATE."""
+    user_ids = list(user_ids)
+    if not user_ids or not delta:
+        return
+    if delta > 0:
+        AuthorCounter.objects.bulk_create(
+            [AuthorCounter(author_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+    AuthorCounter.objects.filter(author_id__in=user_ids).update(
+        feed_count=F('feed_count') + delta
+    )
+
+
+def total_posts():
+    """Число всех постов по счётчику."""
+    return SiteCounter.objects.filter(
+        name=POSTS_TOTAL
+    ).values_list('value', flat=True).first() or 0
+
+
+def author_posts(author):
+    """Число постов автора по счётчику, загруженному вместе с автором."""
+    try:
+        return author.post_counter.posts_count
+    except AuthorCounter.DoesNotExist:
+        return 0
+
+
+def feed_posts(user):
+    """Число постов в ленте подписок пользователя по счётчику."""
+    return AuthorCounter.objects.filter(
+        author=user
+    ).values_list('feed_count', flat=True).first() or 0
+
+
+def recount():
+    """Пересчитывает все счётчики по таблицам постов и лент."""
+    authors = dict(
+        Post.objects.values_list('author').annotate(Count('pk')).order_by()
+    )
+    feeds = dict(
+        FeedItem.objects.values_list('user').annotate(Count('pk')).order_by()
+    )
+    for author_id in User.objects.values_list('pk', flat=True).iterator():
+        AuthorCounter.objects.update_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': authors.get(author_id, 0),
+                'feed_count': feeds.get(author_id, 0),
+            }
+        )
+    groups = dict(
+        Post.objects.values_list('group').annotate(Count('pk')).order_by()
+    )
+    for group_id in Group.objects.values_list('pk', flat=True).iterator():
+        Group.objects.filter(pk=group_id).update(
+            posts_count=groups.get(group_id, 0)
+        )
+    SiteCounter.objects.update_or_create(
+        name=POSTS_TOTAL, defaults={'value': Post.objects.count()}
+    )
@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.db.models import F
+
+from . import counters
+from .models import AuthorCounter, FeedItem, Follow, Post
+
+FEED_KEYS = ('feed_date', 'feed_post')
+
+
+def feed_posts(user):
+    """Посты из материализованной ленты пользователя."""
+    # Порядок по столбцам FeedItem, а не поста: тогда SQLite идёт
+    # по индексу ленты и не сортирует выборку.
+    return Post.objects.filter(
+        feed_items__user=user
+    ).annotate(
+        feed_date=F('feed_items__pub_date'),
+        feed_post=F('feed_items__post'),
+    ).order_by('-feed_date', '-feed_post')
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).exclude(
+        user__feed_items__post=post
+    ).values_list('user_id', flat=True))
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True
+    )
+    counters.bump_feeds(followers, 1)
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту пользователя все посты автора.
+
+    Посты, уже лежащие в ленте, пропускаются заранее: счётчик ленты
+    сдвигается на число действительно добавленных строк.
+    """
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).exclude(
+        feed_items__user_id=user_id
+    ).values_list('pk', 'pub_date')
+    feed_items = FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator()
+        ],
+        ignore_conflicts=True
+    )
+    counters.bump_feeds([user_id], len(feed_items))
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты пользователя посты автора."""
+    _, deleted = FeedItem.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+    counters.bump_feeds(
+        [user_id], -deleted.get(FeedItem._meta.label, 0)
+    )
+
+
+def readers(post):
+    """Пользователи, в чьих лентах лежит пост."""
+    return list(FeedItem.objects.filter(
+        post=post
+    ).values_list('user_id', flat=True))
+
+
+@transaction.atomic
+def rebuild(users=None):
+    """Пересобирает ленты заново по текущим подпискам.
+
+    Всё в одной транзакции: пока ленты пересобираются, читатели видят
+    старые, а не пустые.
+    """
+    feed_items = FeedItem.objects.all()
+    follows = Follow.objects.all()
+    feed_counters = AuthorCounter.objects.all()
+    if users is not None:
+        feed_items = feed_items.filter(user__in=users)
+        follows = follows.filter(user__in=users)
+        feed_counters = feed_counters.filter(author__in=users)
+    feed_items.delete()
+    feed_counters.update(feed_count=0)
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        add_author(user_id, author_id)
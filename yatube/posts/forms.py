@@ -1,5 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -8,6 +11,44 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файл сверх лимита не сохранён целиком: его не передаём полю,
+        # а сообщаем об ошибке в clean_image.
+        self.too_large = {
+            name for name, file in self.files.items()
+            if getattr(file, 'too_large', False)
+        }
+        if self.too_large:
+            self.files = self.files.copy()
+            for name in self.too_large:
+                del self.files[name]
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if self.add_prefix('image') in self.too_large:
+            raise forms.ValidationError(
+                'Файл больше %(limit)d МБ.',
+                code='too_large',
+                params={'limit': settings.IMAGE_UPLOAD_MAX_BYTES // 2 ** 20},
+            )
+        if not isinstance(image, UploadedFile):
+            return image
+        width, height = image.image.size
+        if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Картинка больше %(limit)d мегапикселей.',
+                code='too_many_pixels',
+                params={'limit': settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6},
+            )
+        try:
+            return uploads.normalize(image)
+        except uploads.ImageRejected:
+            raise forms.ValidationError(
+                self.fields['image'].error_messages['invalid_image'],
+                code='invalid_image',
+            )
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,188 @@
+"""Подготовка картинок постов при загрузке.
+
+Размеры, основной цвет и blurhash считаются сразу при сохранении
+поста. Адаптивные варианты для ``srcset`` нарезаются в фоне: картинка
+обрезается под пропорции карточки и сохраняется в нескольких ширинах
+в WebP и в JPEG для браузеров без WebP. Всё это записывается в сам
+пост, поэтому шаблону не нужны ни файловая система, ни хранилище
+миниатюр.
+
+Имена вариантов выводятся из имени исходной картинки, то есть из её
+содержимого: одинаковые загрузки делят один набор вариантов, он
+нарезается один раз и удаляется сборщиком мусора вместе с картинкой.
+"""
+import json
+import logging
+import os
+from io import BytesIO
+
+import blurhash
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from tasks.models import Task
+from tasks.queue import enqueue
+
+from . import thumbnails
+from .models import Post
+
+CARD_SIZE = (960, 339)
+WIDTHS = (320, 640, 960)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+VARIANTS_DIR = 'posts/variants/'
+PREVIEW_SIZE = (32, 32)
+PALETTE_SIZE = 8
+BLURHASH_COMPONENTS = (4, 3)
+
+logger = logging.getLogger(__name__)
+
+
+def describe(file):
+    """Размеры, основной цвет и blurhash картинки из открытого файла."""
+    image = Image.open(file)
+    width, height = image.size
+    image.draft('RGB', PREVIEW_SIZE)
+    image = image.convert('RGB')
+    image.thumbnail(PREVIEW_SIZE)
+    palette = image.quantize(PALETTE_SIZE)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    pixels = image.load()
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'image_blurhash': blurhash.encode(
+            [
+                [pixels[x, y] for x in range(image.width)]
+                for y in range(image.height)
+            ],
+            *BLURHASH_COMPONENTS
+        ),
+    }
+
+
+def describe_stored(name):
+    """То же для картинки из хранилища; годится для пула процессов."""
+    with Post.image.field.storage.open(name) as file:
+        return describe(file)
+
+
+def describe_post(post):
+    """Заполняет у поста размеры, цвет и blurhash новой картинки."""
+    meta = dict.fromkeys(('image_width', 'image_height'))
+    meta.update(image_color='', image_blurhash='')
+    if post.image:
+        try:
+            post.image.open()
+            meta = describe(post.image)
+            post.image.seek(0)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            logger.warning('Не удалось прочитать картинку %s', post.image)
+    for field, value in meta.items():
+        setattr(post, field, value)
+
+
+def schedule(post):
+    """Ставит нарезку вариантов картинки поста в очередь задач.
+
+    Варианты ждут после миниатюр: без них карточка показывает миниатюру.
+    """
+    if post.image:
+        enqueue(
+            build, post.image.name,
+            priority=Task.LOW,
+            key=f'images.build:{post.image.name}',
+        )
+
+
+def _widths(source_width):
+    # Картинку не растягиваем: ширины больше исходной не нужны,
+    # но хотя бы один вариант остаётся.
+    widths = [width for width in WIDTHS if width <= source_width]
+    return widths or WIDTHS[:1]
+
+
+def card_size(source_width):
+    """Размер карточки картинки шириной ``source_width``.
+
+    Совпадает с наибольшим вариантом, так что шаблон знает размеры
+    карточки по полям поста, не заглядывая ни в варианты, ни в миниатюры.
+    """
+    width = _widths(source_width)[-1]
+    return width, _height(width)
+
+
+def _height(width):
+    return round(width * CARD_SIZE[1] / CARD_SIZE[0])
+
+
+def _formats():
+    # Pillow без libwebp не умеет сохранять WebP: тогда остаётся JPEG.
+    Image.init()
+    return [
+        (kind, pil_format, options) for kind, pil_format, options in FORMATS
+        if pil_format in Image.SAVE
+    ]
+
+
+def variant_name(name, width, kind):
+    """Имя варианта картинки ``name`` заданной ширины и формата."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{VARIANTS_DIR}{stem}-{width}.{EXTENSIONS[kind]}'
+
+
+def delete_variants(name):
+    """Удаляет все варианты картинки, какие есть."""
+    for width in WIDTHS:
+        for kind in EXTENSIONS:
+            variant = variant_name(name, width, kind)
+            if default_storage.exists(variant):
+                default_storage.delete(variant)
+
+
+def render(name):
+    """Нарезает недостающие варианты картинки и возвращает их описание."""
+    with Post.image.field.storage.open(name) as file:
+        source_width = Image.open(file).width
+    formats = _formats()
+    variants, missing = {}, []
+    for width in _widths(source_width):
+        height = _height(width)
+        for kind, pil_format, options in formats:
+            variant = variant_name(name, width, kind)
+            variants.setdefault(kind, []).append([variant, width, height])
+            if not default_storage.exists(variant):
+                missing.append((variant, (width, height), pil_format, options))
+    if missing:
+        _save_variants(name, missing)
+    return variants
+
+
+def _save_variants(name, missing):
+    with Post.image.field.storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    image = image.convert('RGB')
+    resized = {}
+    for variant, size, pil_format, options in missing:
+        if size not in resized:
+            resized[size] = ImageOps.fit(image, size, Image.LANCZOS)
+        buffer = BytesIO()
+        resized[size].save(buffer, pil_format, **options)
+        saved = default_storage.save(variant, ContentFile(buffer.getvalue()))
+        if saved != variant:
+            # Тот же вариант успел сохранить другой воркер.
+            default_storage.delete(saved)
+
+
+def build(name):
+    """Нарезает варианты картинки и сохраняет их во все посты с ней."""
+    variants = json.dumps(render(name))
+    if Post.objects.filter(image=name).update(image_variants=variants):
+        thumbnails.refresh_pages(name)
@@ -0,0 +1,118 @@
+import random
+import time
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from posts import cards
+from posts.models import Group, Post, User
+from posts.utils import KeysetPaginator
+
+AUTHORS = 20
+GROUPS = 5
+PAGE_SIZES = (10, 100)
+REPEAT = 20
+WORDS = 'лента пост автор группа картинка текст подписка тег'.split()
+
+
+class Rollback(Exception):
+    pass
+
+
+def model_page(per_page):
+    posts = Post.objects.select_related('author', 'group')
+    return KeysetPaginator(posts, per_page).get_page(1)
+
+
+def card_page(per_page):
+    keys = ('pub_date', 'pk')
+    return KeysetPaginator(
+        cards.values(Post.objects.all(), keys), per_page, keys,
+        cards.PostCard.from_row,
+    ).get_page(1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает страницу ленты из полных моделей и из карточек '
+        'по времени и памяти: выборка с построением страницы и отрисовка '
+        'шаблона. Тестовые посты откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--text-length', type=int, default=3000)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        try:
+            with transaction.atomic():
+                self.seed(options['posts'], options['text_length'])
+                for per_page in PAGE_SIZES:
+                    self.stdout.write(self.style.MIGRATE_HEADING(
+                        f'{per_page} постов на странице'
+                    ))
+                    for name, build in (
+                        ('модели', model_page), ('карточки', card_page)
+                    ):
+                        self.bench(name, build, per_page, request)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, text_length):
+        suffix = time.strftime('%H%M%S')
+        User.objects.bulk_create(
+            User(
+                username=f'bench{suffix}{i}',
+                first_name='Имя', last_name=f'Фамилия {i}',
+            )
+            for i in range(AUTHORS)
+        )
+        authors = list(User.objects.filter(
+            username__startswith=f'bench{suffix}'
+        ))
+        groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'bench{suffix}{i}',
+                description='Описание группы ' * 20,
+            )
+            for i in range(GROUPS)
+        ]
+        words = len(WORDS)
+        Post.objects.bulk_create(
+            Post(
+                author=random.choice(authors),
+                group=random.choice(groups + [None]),
+                text=' '.join(
+                    random.choices(WORDS, k=text_length // words)
+                ),
+            )
+            for _ in range(count)
+        )
+
+    def bench(self, name, build, per_page, request):
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            render_to_string(
+                'posts/index.html', {'page_obj': build(per_page)}, request
+            )
+        elapsed = (time.perf_counter() - started) / REPEAT * 1000
+        tracemalloc.start()
+        page = build(per_page)
+        retained, built_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        render_to_string('posts/index.html', {'page_obj': page}, request)
+        _, render_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{name:>8}: {elapsed:6.2f} мс на запрос, страница держит '
+            f'{retained / 1024:7.1f} КиБ, пик при выборке '
+            f'{built_peak / 1024:7.1f} КиБ, при отрисовке '
+            f'{render_peak / 1024:7.1f} КиБ'
+        )
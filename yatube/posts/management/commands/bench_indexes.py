@@ -0,0 +1,155 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.feed import feed_posts
+from posts.models import Comment, FeedItem, Group, Post, User
+
+BATCH_SIZE = 10000
+REPEAT = 20
+COMPOSITE_INDEXES = (
+    (Post, 'post_author_pub_date_idx'),
+    (Post, 'post_group_pub_date_idx'),
+    (Comment, 'comment_post_pub_date_idx'),
+    (FeedItem, 'feed_user_pub_date_post_idx'),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу тестовыми постами и показывает планы и время '
+        'горячих запросов без составных индексов и с ними. '
+        'Все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options)
+                queries = self.hot_queries()
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    'Без составных индексов'
+                ))
+                self.drop_indexes()
+                connection.cursor().execute('ANALYZE')
+                self.report(queries)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    'С составными индексами'
+                ))
+                self.create_indexes()
+                self.report(queries)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        started = time.perf_counter()
+        suffix = timezone.now().strftime('%H%M%S%f')
+        authors = [
+            User.objects.create(username=f'bench{suffix}_{i}').pk
+            for i in range(options['authors'])
+        ]
+        groups = [
+            Group.objects.create(
+                title=f'bench {i}', slug=f'bench-{suffix}-{i}',
+                description='bench'
+            ).pk
+            for i in range(options['groups'])
+        ]
+        now = timezone.now()
+        table = Post._meta.db_table
+        sql = (
+            f'INSERT INTO {table} (text, pub_date, author_id, group_id, '
+            f'image) VALUES (%s, %s, %s, %s, %s)'
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, options['posts'], BATCH_SIZE):
+                stop = min(start + BATCH_SIZE, options['posts'])
+                cursor.executemany(sql, [
+                    (
+                        f'Пост {i}',
+                        now - timedelta(seconds=i),
+                        random.choice(authors),
+                        random.choice(groups + [None]),
+                        '',
+                    ) for i in range(start, stop)
+                ])
+        self.author, self.group = authors[0], groups[0]
+        self.post = Post.objects.filter(author_id=self.author).first()
+        follower = User.objects.create(username=f'bench{suffix}_reader')
+        FeedItem.objects.bulk_create(
+            FeedItem(user=follower, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in Post.objects.filter(
+                author_id__in=authors[:20]
+            ).values_list('pk', 'pub_date')
+        )
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author_id=author, text='bench')
+            for author in authors
+        )
+        self.follower = follower
+        self.stdout.write(
+            f'Заполнено {options["posts"]} постов '
+            f'за {time.perf_counter() - started:.1f} c'
+        )
+
+    def hot_queries(self):
+        page = Post.objects.order_by('-pub_date', '-id')
+        deep = Post.objects.filter(author_id=self.author).order_by(
+            '-pub_date', '-id'
+        )[200:201].get()
+        return {
+            'profile': page.filter(author_id=self.author)[:11],
+            'group_posts': page.filter(group_id=self.group)[:11],
+            'profile, курсор': page.filter(author_id=self.author).filter(
+                Q(pub_date__lt=deep.pub_date)
+                | Q(pub_date=deep.pub_date, id__lt=deep.id)
+            )[:11],
+            'post_detail, комментарии': Comment.objects.filter(
+                post=self.post
+            ),
+            'follow_index': feed_posts(self.follower)[:11],
+        }
+
+    def report(self, queries):
+        for name, queryset in queries.items():
+            started = time.perf_counter()
+            for _ in range(REPEAT):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / REPEAT * 1000
+            self.stdout.write(f'{name}: {elapsed:.2f} мс')
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'    {line}')
+
+    def drop_indexes(self):
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for _, name in COMPOSITE_INDEXES:
+                cursor.execute(f'DROP INDEX {editor.quote_name(name)}')
+
+    def create_indexes(self):
+        # schema_editor() как менеджер контекста в транзакции SQLite
+        # недоступен, поэтому SQL индексов выполняется напрямую.
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, name in COMPOSITE_INDEXES:
+                index = next(
+                    index for index in model._meta.indexes
+                    if index.name == name
+                )
+                cursor.execute(str(index.create_sql(model, editor)))
+        connection.cursor().execute('ANALYZE')
@@ -0,0 +1,111 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.search import matching, search_posts
+
+BATCH_SIZE = 10000
+REPEAT = 20
+WORDS_PER_POST = 30
+VOCABULARY_SIZE = 20000
+SYLLABLES = (
+    'ка ло ми ре то ну са ве ди ро па ле ны го ша мо ти ла ку зе'
+).split()
+# Ранги слов в словаре для запросов: частое, среднее, редкое
+# и их сочетания; частоты слов распределены по закону Ципфа.
+QUERIES = ((0,), (100,), (5000,), (100, 300), (20, 40, 60))
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу тестовыми постами и сравнивает поиск через '
+        'LIKE с полнотекстовым индексом FTS5. Все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                words = self.seed(options['posts'])
+                for ranks in QUERIES:
+                    text = ' '.join(words[rank] for rank in ranks)
+                    self.stdout.write(self.style.MIGRATE_HEADING(text))
+                    like = self.like(text)
+                    self.report('LIKE', like, like)
+                    self.report('FTS5', search_posts(text), matching(text))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def vocabulary(self):
+        words = set()
+        while len(words) < VOCABULARY_SIZE:
+            words.add(''.join(random.choices(SYLLABLES, k=4)))
+        return list(words)
+
+    def seed(self, count):
+        started = time.perf_counter()
+        words = self.vocabulary()
+        weights = list(accumulate(
+            1 / rank for rank in range(1, len(words) + 1)
+        ))
+        suffix = timezone.now().strftime('%H%M%S%f')
+        author = User.objects.create(username=f'bench{suffix}').pk
+        now = timezone.now()
+        table = Post._meta.db_table
+        sql = (
+            f'INSERT INTO {table} (text, pub_date, author_id, image, '
+            f"image_color, image_blurhash, image_variants) "
+            f"VALUES (%s, %s, %s, '', '', '', '')"
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, count, BATCH_SIZE):
+                stop = min(start + BATCH_SIZE, count)
+                cursor.executemany(sql, [
+                    (
+                        ' '.join(random.choices(
+                            words, cum_weights=weights, k=WORDS_PER_POST
+                        )),
+                        now - timedelta(seconds=i),
+                        author,
+                    ) for i in range(start, stop)
+                ])
+        self.stdout.write(
+            f'Заполнено {count} постов с индексом '
+            f'за {time.perf_counter() - started:.1f} c'
+        )
+        return words
+
+    def like(self, text):
+        # Так искала админка: каждое слово через LIKE '%слово%'.
+        condition = Q()
+        for word in text.split():
+            condition &= Q(text__icontains=word)
+        return Post.objects.filter(condition)
+
+    def report(self, name, queryset, matches):
+        page = queryset[:11]
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            list(page.all())
+        elapsed = (time.perf_counter() - started) / REPEAT * 1000
+        started = time.perf_counter()
+        found = matches.count()
+        counted = (time.perf_counter() - started) * 1000
+        self.stdout.write(
+            f'{name}: страница {elapsed:.2f} мс, '
+            f'всего {found} за {counted:.2f} мс'
+        )
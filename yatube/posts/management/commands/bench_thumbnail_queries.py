@@ -0,0 +1,120 @@
+import time
+from io import BytesIO
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts import thumbnails
+from posts.models import Post, User
+from posts.views import index
+
+STORES = (
+    ('sorl cached_db', 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'),
+    ('кеш + отложенная запись', 'posts.thumbnail_kvstore.KVStore'),
+)
+KVSTORE_TABLE = 'thumbnail_kvstore'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает запросы к базе при выводе главной страницы с картинками '
+        'для разных хранилищ метаданных миниатюр sorl. Посты и картинки '
+        'создаются временно и удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+
+    def handle(self, *args, **options):
+        names = []
+        original = default.kvstore._wrapped
+        try:
+            with transaction.atomic():
+                names = self.seed(options['posts'])
+                for title, path in STORES:
+                    default.kvstore._wrapped = import_string(path)()
+                    self.stdout.write(self.style.MIGRATE_HEADING(title))
+                    self.measure(names)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            default.kvstore._wrapped = original
+            for name in names:
+                default_storage.delete(name)
+
+    def seed(self, count):
+        suffix = time.strftime('%H%M%S')
+        author = User.objects.create(username=f'bench{suffix}')
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 600), 'teal').save(buffer, 'JPEG')
+        names = [
+            default_storage.save(
+                f'posts/bench-{suffix}-{i}.jpg',
+                ContentFile(buffer.getvalue())
+            )
+            for i in range(count)
+        ]
+        # bulk_create не шлёт сигналов: миниатюры режутся здесь же,
+        # а не в фоновом пуле.
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}', image=name)
+            for i, name in enumerate(names)
+        )
+        return names
+
+    def measure(self, names):
+        self.forget(names)
+        self.report('холодный кеш, миниатюр нет')
+        for name in names:
+            for geometry_string, options in thumbnails.POST_THUMBNAILS:
+                thumbnails.generate(name, geometry_string, options)
+        if hasattr(default.kvstore, 'flush'):
+            default.kvstore.flush()
+        self.report('тёплый кеш')
+        self.forget_cache()
+        self.report('кеш сброшен, метаданные в базе')
+        self.forget(names)
+
+    def forget_cache(self):
+        keys = default.kvstore._find_keys_raw(
+            sorl_settings.THUMBNAIL_KEY_PREFIX
+        )
+        cache.delete_many(list(keys))
+
+    def forget(self, names):
+        self.forget_cache()
+        for name in names:
+            default.kvstore.delete_thumbnails(
+                default.kvstore.get_or_set(thumbnails.source(name))
+            )
+        self.forget_cache()
+        if hasattr(default.kvstore, 'flush'):
+            default.kvstore.flush()
+
+    def report(self, title):
+        request = RequestFactory().get('/', {'bench': 1})
+        request.user = AnonymousUser()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            index(request)
+            elapsed = (time.perf_counter() - started) * 1000
+        kvstore = sum(KVSTORE_TABLE in query['sql'] for query in queries)
+        self.stdout.write(
+            f'{title}: запросов {len(queries)}, '
+            f'из них к {KVSTORE_TABLE} {kvstore}, {elapsed:.1f} мс'
+        )
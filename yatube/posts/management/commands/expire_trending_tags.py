@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import cache, tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Убирает из трендов корзины, выпавшие из окна. Запускается '
+        'раз в час, например из cron: иначе без новых постов тренды '
+        'не устаревают.'
+    )
+
+    def handle(self, *args, **options):
+        if tags.expire():
+            cache.bump('index')
+        self.stdout.write(self.style.SUCCESS('Тренды обновлены.'))
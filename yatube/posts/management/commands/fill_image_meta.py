@@ -0,0 +1,70 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import cache, images
+from posts.models import Post
+
+FIELDS = ('image_width', 'image_height', 'image_color', 'image_blurhash')
+BATCH_SIZE = 500
+
+
+def describe(name):
+    try:
+        return images.describe_stored(name), None
+    except Exception as error:
+        return None, f'{name}: {error}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, основной цвет и blurhash для уже '
+        'загруженных картинок постов в пуле процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать и уже заполненные картинки'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_blurhash='')
+        posts = list(posts.select_related('author').only(
+            'pk', 'image', 'author__username'
+        ))
+        # Соединения с базой не должны достаться процессам пула.
+        connections.close_all()
+        with ProcessPoolExecutor(options['workers']) as pool:
+            results = pool.map(
+                describe, [post.image.name for post in posts], chunksize=16
+            )
+            updated, failed = [], 0
+            for post, (meta, error) in zip(posts, results):
+                if error:
+                    failed += 1
+                    self.stderr.write(error)
+                    continue
+                for field, value in meta.items():
+                    setattr(post, field, value)
+                updated.append(post)
+        Post.objects.bulk_update(updated, FIELDS, batch_size=BATCH_SIZE)
+        # bulk_update не шлёт сигналов: страницы сбрасываются вручную.
+        # Группы и посты зависят от областей 'users' и 'index'.
+        cache.bump('index', 'users', *{
+            f'author:{post.author.username}' for post in updated
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {len(updated)}, ошибок: {failed}, '
+            f'за {time.perf_counter() - started:.1f} c.'
+        ))
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+
+from posts import images, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Нарезает миниатюры и адаптивные варианты для уже загруженных '
+        'картинок постов в несколько потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число потоков нарезки'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        posts = Post.objects.exclude(image='')
+        names = posts.values_list('image', flat=True).distinct()
+        tasks = [
+            (thumbnails.generate, name, *thumbnail)
+            for name in names.iterator()
+            for thumbnail in thumbnails.POST_THUMBNAILS
+        ]
+        tasks.extend(
+            (images.build, name)
+            for name in posts.filter(image_variants='').values_list(
+                'image', flat=True
+            ).distinct().iterator()
+        )
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(*task): task for task in tasks
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{futures[future][1]}: {error}')
+        default.kvstore.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {len(tasks) - failed}, ошибок: {failed}, '
+            f'за {time.perf_counter() - started:.1f} c.'
+        ))
@@ -0,0 +1,59 @@
+import os
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from posts import blobs, cache, images, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит уже загруженные картинки постов в хранилище '
+        'по содержимому и пересчитывает ссылки на файлы.'
+    )
+
+    def handle(self, *args, **options):
+        storage = blobs.storage
+        moved, usernames, missing = {}, set(), 0
+        posts = Post.objects.exclude(image='').select_related('author').only(
+            'pk', 'image', 'author__username'
+        )
+        for post in posts.iterator():
+            old = post.image.name
+            if storage.is_content_name(old):
+                continue
+            if old not in moved:
+                if not storage.exists(old):
+                    missing += 1
+                    self.stderr.write(f'Нет файла {old}')
+                    continue
+                with storage.open(old) as file:
+                    moved[old] = storage.save(
+                        os.path.join(blobs.UPLOAD_TO, os.path.basename(old)),
+                        file
+                    )
+            # update() не шлёт сигналов: ссылки пересчитываются ниже.
+            # Варианты названы по старому имени и нарезаются заново.
+            Post.objects.filter(pk=post.pk).update(
+                image=moved[old], image_variants=''
+            )
+            usernames.add(post.author.username)
+        blobs.recount()
+        for old, new in moved.items():
+            delete_with_thumbnails(ImageFile(old, storage))
+            images.delete_variants(old)
+            for geometry_string, thumbnail_options in (
+                thumbnails.POST_THUMBNAILS
+            ):
+                thumbnails.schedule(new, geometry_string, thumbnail_options)
+            images.schedule(Post(image=new))
+        cache.bump('index', 'users', *(
+            f'author:{username}' for username in usernames
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {len(moved)}, '
+            f'уникальных: {len(set(moved.values()))}, '
+            f'не найдено: {missing}.'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import cache, tags
+from posts.models import Tag
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает теги постов, их хронологии и тренды по текстам.'
+
+    def handle(self, *args, **options):
+        tags.rebuild()
+        cache.bump('index', *(
+            f'tag:{name}'
+            for name in Tag.objects.values_list('name', flat=True)
+        ))
+        self.stdout.write(self.style.SUCCESS('Теги пересобраны.'))
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorCounter = apps.get_model('posts', 'AuthorCounter')
+    db_alias = schema_editor.connection.alias
+    authors = Post.objects.using(db_alias).values_list('author').annotate(
+        Count('pk')
+    )
+    AuthorCounter.objects.using(db_alias).bulk_create(
+        AuthorCounter(author_id=author_id, posts_count=posts_count)
+        for author_id, posts_count in authors.order_by()
+    )
+    groups = Post.objects.using(db_alias).values_list('group').annotate(
+        Count('pk')
+    )
+    for group_id, posts_count in groups.order_by():
+        Group.objects.using(db_alias).filter(pk=group_id).update(
+            posts_count=posts_count
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_feeditem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.CreateModel(
+            name='AuthorCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='post_counter', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
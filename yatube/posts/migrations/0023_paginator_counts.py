@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:11
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    FeedItem = apps.get_model('posts', 'FeedItem')
+    AuthorCounter = apps.get_model('posts', 'AuthorCounter')
+    SiteCounter = apps.get_model('posts', 'SiteCounter')
+    db_alias = schema_editor.connection.alias
+    SiteCounter.objects.using(db_alias).create(
+        name='posts', value=Post.objects.using(db_alias).count()
+    )
+    feeds = FeedItem.objects.using(db_alias).values_list('user').annotate(
+        Count('pk')
+    )
+    for user_id, feed_count in feeds.order_by():
+        AuthorCounter.objects.using(db_alias).update_or_create(
+            author_id=user_id, defaults={'feed_count': feed_count}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Название')),
+                ('value', models.PositiveIntegerField(default=0, verbose_name='Значение')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='authorcounter',
+            name='feed_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Постов в ленте подписок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
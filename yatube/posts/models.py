@@ -1,7 +1,11 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.fields import FullTextField
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 from yatube.settings import NUM_TEXT
 
 User = get_user_model()
@@ -30,23 +34,83 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False
+    )
+    image_color = models.CharField(
+        'Основной цвет картинки', max_length=7, blank=True, editable=False
+    )
+    image_blurhash = models.CharField(
+        'Blurhash картинки', max_length=64, blank=True, editable=False
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False,
+        help_text='JSON с адаптивными вариантами картинки по форматам'
+    )
 
     class Meta:
-        ordering = ('-pub_date'),
+        ordering = ('-pub_date', '-id')
         default_related_name = 'posts'
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:NUM_TEXT]
 
+    @property
+    def variants(self):
+        return json.loads(self.image_variants) if self.image_variants else {}
+
+
+class PostSearch(models.Model):
+    """Полнотекстовый индекс FTS5 по текстам постов.
+
+    Таблицу и триггеры, которые держат её в согласии с постами,
+    создаёт ``posts.search``; сама модель нужна для соединения
+    с постами в запросах.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index'
+    )
+    text = FullTextField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'группа'
@@ -70,6 +134,15 @@ class Comment(CreatedModel):
         help_text='Введите текст комментария'
     )
 
+    class Meta:
+        ordering = ('pub_date', 'id')
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date', 'id'],
+                name='comment_post_pub_date_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -91,3 +164,151 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class FeedItem(models.Model):
+    """Материализованная лента подписок: пост в ленте пользователя."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='feed_items'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='feed_items'
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_item'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_post_idx'
+            )
+        ]
+
+
+class Tag(models.Model):
+    """Хештег из текстов постов."""
+    name = models.CharField('Название', max_length=64, unique=True)
+    recent_count = models.PositiveIntegerField(
+        'Постов за окно трендов',
+        default=0,
+        editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+        indexes = [
+            models.Index(
+                fields=['-recent_count', 'name'],
+                name='tag_trending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Хронология тега: пост с тегом, его дата и группа."""
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE,
+        related_name='post_tags'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='post_tags'
+    )
+    group = models.ForeignKey(
+        Group, on_delete=models.SET_NULL,
+        blank=True, null=True,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'post'],
+                name='unique_post_tag'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date', '-post'],
+                name='post_tag_pub_date_idx'
+            ),
+            models.Index(
+                fields=['tag', 'group', '-pub_date', '-post'],
+                name='post_tag_group_pub_date_idx'
+            ),
+        ]
+
+
+class TagBucket(models.Model):
+    """Число постов с тегом за час внутри окна трендов."""
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE,
+        related_name='buckets'
+    )
+    start = models.DateTimeField('Начало часа')
+    count = models.PositiveIntegerField('Количество постов', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'start'],
+                name='unique_tag_bucket'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['start'], name='tag_bucket_start_idx'),
+        ]
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище по содержимому и число ссылок на него."""
+    name = models.CharField('Имя файла', max_length=255, unique=True)
+    refs = models.PositiveIntegerField('Количество ссылок', default=0)
+    updated = models.DateTimeField('Изменён', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+        indexes = [
+            models.Index(fields=['refs', 'updated'], name='blob_refs_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}: {self.refs}'
+
+
+class AuthorCounter(models.Model):
+    """Денормализованные счётчики пользователя: его посты и его лента."""
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE,
+        related_name='post_counter'
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    feed_count = models.PositiveIntegerField(
+        'Постов в ленте подписок', default=0
+    )
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class SiteCounter(models.Model):
+    """Денормализованный счётчик на весь сайт, например всех постов."""
+    name = models.CharField('Название', max_length=64, unique=True)
+    value = models.PositiveIntegerField('Значение', default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
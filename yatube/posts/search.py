@@ -0,0 +1,88 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс ``posts_post_fts`` хранит только токены, а тексты берёт из самой
+таблицы постов (external content). В согласии с постами его держат
+триггеры, поэтому индекс обновляется и при ``bulk_create``
+и ``update()``, которые не посылают сигналов. SQLite пересоздаёт таблицу
+при изменении её схемы и теряет при этом триггеры, так что они
+восстанавливаются после каждого ``migrate``.
+
+Результаты упорядочены по BM25: чем больше ``rank``, тем точнее
+совпадение.
+"""
+import re
+
+from django.db.models.expressions import RawSQL
+
+from .models import Post, PostSearch
+
+TABLE = PostSearch._meta.db_table
+MAX_TERMS = 10
+SEARCH_KEYS = ('rank', 'pk')
+
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    f"text, content='posts_post', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')"
+)
+REBUILD = f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')"
+TRIGGERS = (
+    f'CREATE TRIGGER IF NOT EXISTS {TABLE}_insert '
+    f'AFTER INSERT ON posts_post BEGIN '
+    f'INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {TABLE}_delete '
+    f'AFTER DELETE ON posts_post BEGIN '
+    f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {TABLE}_update '
+    f'AFTER UPDATE OF text ON posts_post BEGIN '
+    f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f'INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END',
+)
+TERM = re.compile(r'\w+')
+
+
+def install_triggers(connection):
+    """Создаёт недостающие триггеры индекса."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if TABLE not in connection.introspection.table_names(cursor):
+            return
+        for sql in TRIGGERS:
+            cursor.execute(sql)
+
+
+def to_query(text):
+    """Запрос FTS5 из пользовательского ввода или ``None``.
+
+    Каждое слово ищется как префикс, чтобы «кот» находил и «коты»:
+    стемминга для русского в FTS5 нет. Операторы FTS5 из ввода
+    не пропускаются — слова берутся в кавычки.
+    """
+    terms = TERM.findall(text.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching(text, queryset=None):
+    """Посты, подходящие под запрос, без ранжирования.
+
+    Годится для ``count()``: SQLite не даёт вызывать ``bm25()``
+    в подзапросе, которым Django считает строки с аннотациями.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    query = to_query(text)
+    if query is None:
+        return queryset.none()
+    return queryset.filter(search_index__text__match=query)
+
+
+def search_posts(text, queryset=None):
+    """Посты, подходящие под запрос, с релевантностью в ``rank``."""
+    return matching(text, queryset).annotate(
+        rank=RawSQL(f'-bm25({TABLE})', ())
+    ).order_by('-rank', '-pk')
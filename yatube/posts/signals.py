@@ -0,0 +1,183 @@
+from django.db import connections
+from django.db.models import DEFERRED
+from django.db.models.signals import (post_delete, post_init, post_migrate,
+                                      post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import (blobs, cache, counters, feed, images, search, tags,
+               thumbnails)
+from .models import Comment, Follow, Group, Post, User
+
+
+def post_scopes(post, *group_ids):
+    """Области кеша, которые затрагивает изменение поста."""
+    group_ids = {group_id for group_id in group_ids if group_id}
+    slugs = Group.objects.filter(
+        pk__in=group_ids
+    ).values_list('slug', flat=True) if group_ids else ()
+    return (
+        'index',
+        f'author:{post.author.username}',
+        *(f'group:{slug}' for slug in slugs),
+        *(f'tag:{name}' for name in tags.names(post)),
+    )
+
+
+# Поля, изменения которых отслеживаются: _loaded_<поле> хранит значение
+# из базы, а для отложенных через only()/defer() — DEFERRED.
+TRACKED = ('group_id', 'text', 'image')
+
+
+def current(instance, attname):
+    value = instance.__dict__.get(attname, DEFERRED)
+    return getattr(value, 'name', value)
+
+
+def remember_loaded(instance, attnames=TRACKED):
+    for attname in attnames:
+        setattr(instance, f'_loaded_{attname}', current(instance, attname))
+
+
+def changed(instance, attname):
+    """Изменилось ли поле; отложенное и не присвоенное не изменилось."""
+    value = current(instance, attname)
+    return value is not DEFERRED and value != getattr(
+        instance, f'_loaded_{attname}'
+    )
+
+
+def loaded_group_id(instance):
+    group_id = instance._loaded_group_id
+    return None if group_id is DEFERRED else group_id
+
+
+def fetch_deferred(instance):
+    """Дочитывает прежние значения полей, отложенных при загрузке
+    и присвоенных после неё."""
+    assigned = [
+        attname for attname in TRACKED
+        if getattr(instance, f'_loaded_{attname}') is DEFERRED
+        and attname in instance.__dict__
+    ]
+    if not assigned or instance._state.adding:
+        return
+    row = Post.objects.filter(pk=instance.pk).values(*assigned).first()
+    for attname in assigned:
+        setattr(instance, f'_loaded_{attname}', (row or {}).get(attname))
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    remember_loaded(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    fetch_deferred(instance)
+    if 'image' not in instance.__dict__:
+        return
+    image = instance.image
+    if not image._committed or image.name != instance._loaded_image:
+        images.describe_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+        counters.bump_author(instance.author_id, 1)
+        counters.bump_group(instance.group_id, 1)
+        counters.bump_total(1)
+    elif changed(instance, 'group_id'):
+        counters.bump_group(instance._loaded_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+        tags.move_group(instance)
+    if changed(instance, 'image'):
+        image_changed(instance)
+    tag_names = ()
+    if created or changed(instance, 'text'):
+        tag_names = tags.sync(instance)
+    cache.bump(
+        *post_scopes(instance, instance.group_id, loaded_group_id(instance)),
+        *(f'tag:{name}' for name in tag_names),
+    )
+    remember_loaded(instance)
+
+
+def image_changed(post):
+    blobs.release(post._loaded_image)
+    blobs.acquire(post.image.name)
+    if post.image_variants:
+        post.image_variants = ''
+        Post.objects.filter(pk=post.pk).update(image_variants='')
+    thumbnails.schedule_post(post)
+    images.schedule(post)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    deferred = instance.get_deferred_fields()
+    if deferred:
+        instance.refresh_from_db(fields=deferred)
+        remember_loaded(instance, [
+            attname for attname in TRACKED
+            if getattr(instance, f'_loaded_{attname}') is DEFERRED
+        ])
+    instance._loaded_tags = tags.untag(instance)
+    instance._loaded_readers = feed.readers(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    blobs.release(instance.image.name)
+    counters.bump_author(instance.author_id, -1)
+    counters.bump_group(instance._loaded_group_id, -1)
+    counters.bump_total(-1)
+    counters.bump_feeds(instance._loaded_readers, -1)
+    cache.bump(
+        *post_scopes(instance, instance._loaded_group_id),
+        *(f'tag:{name}' for name in instance._loaded_tags),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        feed.add_author(instance.user_id, instance.author_id)
+    cache.bump(
+        f'author:{instance.author.username}', f'feed:{instance.user_id}'
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.remove_author(instance.user_id, instance.author_id)
+    cache.bump(
+        f'author:{instance.author.username}', f'feed:{instance.user_id}'
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache.bump('index', 'groups', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    cache.bump('index', 'users', f'author:{instance.username}')
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    if sender.label == Post._meta.app_label:
+        search.install_triggers(connections[using])
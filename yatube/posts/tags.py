@@ -0,0 +1,177 @@
+"""Хештеги постов, их хронологии и тренды.
+
+Теги разбираются из текста при сохранении поста и раскладываются
+в ``PostTag`` вместе с датой поста и группой, так что страница тега
+читается по составному индексу, как страница группы. Для трендов
+посты с тегом считаются в почасовых корзинах, а сумма корзин внутри
+скользящего окна хранится в ``Tag.recent_count`` и меняется на ходу:
+при добавлении тега она растёт, а корзины, выпавшие из окна,
+вычитаются из неё и удаляются.
+"""
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Post, PostTag, Tag, TagBucket
+
+TAG_KEYS = ('tag_date', 'tag_post')
+MAX_TAG_LENGTH = Tag._meta.get_field('name').max_length
+HASHTAG = re.compile(r'(?<![\w#])#(\w+)')
+
+
+def parse(text):
+    """Имена хештегов из текста в нижнем регистре."""
+    return {
+        name.lower() for name in HASHTAG.findall(text)
+        if len(name) <= MAX_TAG_LENGTH
+    }
+
+
+def tagged_posts(tag, group=None):
+    """Посты с тегом из его хронологии, при желании — в одной группе."""
+    post_tags = {'post_tags__tag': tag}
+    if group is not None:
+        post_tags['post_tags__group'] = group
+    # Порядок по столбцам PostTag, а не поста: тогда SQLite идёт
+    # по индексу хронологии и не сортирует выборку.
+    return Post.objects.filter(**post_tags).annotate(
+        tag_date=F('post_tags__pub_date'),
+        tag_post=F('post_tags__post'),
+    ).order_by('-tag_date', '-tag_post')
+
+
+def names(post):
+    """Имена тегов поста по таблице тегов."""
+    return set(PostTag.objects.filter(post=post).values_list(
+        'tag__name', flat=True
+    ))
+
+
+def sync(post):
+    """Приводит теги поста в соответствие с его текстом.
+
+    Возвращает имена тегов, которые были у поста или появились.
+    """
+    wanted = parse(post.text)
+    current = dict(PostTag.objects.filter(post=post).values_list(
+        'tag__name', 'tag_id'
+    ))
+    _remove(post, [current[name] for name in current.keys() - wanted])
+    added = wanted - current.keys()
+    if added:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in added], ignore_conflicts=True
+        )
+        tag_ids = list(Tag.objects.filter(name__in=added).values_list(
+            'pk', flat=True
+        ))
+        PostTag.objects.bulk_create([
+            PostTag(
+                tag_id=tag_id, post=post,
+                group_id=post.group_id, pub_date=post.pub_date,
+            )
+            for tag_id in tag_ids
+        ])
+        for tag_id in tag_ids:
+            bump(tag_id, post.pub_date, 1)
+    return wanted | current.keys()
+
+
+def untag(post):
+    """Убирает все теги поста перед его удалением; возвращает имена."""
+    current = dict(PostTag.objects.filter(post=post).values_list(
+        'tag__name', 'tag_id'
+    ))
+    _remove(post, current.values())
+    return set(current)
+
+
+def _remove(post, tag_ids):
+    if not tag_ids:
+        return
+    PostTag.objects.filter(post=post, tag_id__in=tag_ids).delete()
+    for tag_id in tag_ids:
+        bump(tag_id, post.pub_date, -1)
+
+
+def move_group(post):
+    """Переносит хронологии тегов поста в его новую группу."""
+    PostTag.objects.filter(post=post).update(group_id=post.group_id)
+
+
+def window_start(now=None):
+    """Начало скользящего окна трендов: граница самой старой корзины."""
+    now = now or timezone.now()
+    return bucket_start(now - timedelta(hours=settings.TRENDING_HOURS - 1))
+
+
+def bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def bump(tag_id, pub_date, delta):
+    """Сдвигает счётчик тега в корзине часа ``pub_date`` и в окне.
+
+    Посты старше окна в трендах не участвуют.
+    """
+    start = bucket_start(pub_date)
+    if start < window_start():
+        return
+    updated = TagBucket.objects.filter(tag_id=tag_id, start=start).update(
+        count=F('count') + delta
+    )
+    if not updated:
+        if delta < 0:
+            return
+        _, created = TagBucket.objects.get_or_create(
+            tag_id=tag_id, start=start, defaults={'count': delta}
+        )
+        if not created:
+            bump(tag_id, pub_date, delta)
+            return
+        expire()
+    Tag.objects.filter(pk=tag_id).update(
+        recent_count=F('recent_count') + delta
+    )
+
+
+def expire(now=None):
+    """Вычитает из окна корзины, выпавшие из него, и удаляет их.
+
+    Возвращает, изменились ли тренды.
+    """
+    start = window_start(now)
+    expired = False
+    with transaction.atomic():
+        for pk, tag_id, count in TagBucket.objects.filter(
+            start__lt=start
+        ).values_list('pk', 'tag_id', 'count'):
+            if TagBucket.objects.filter(pk=pk).delete()[0] and count:
+                Tag.objects.filter(pk=tag_id).update(
+                    recent_count=F('recent_count') - count
+                )
+                expired = True
+    return expired
+
+
+def trending(limit=None):
+    """Теги с наибольшим числом постов в окне."""
+    return Tag.objects.filter(recent_count__gt=0).order_by(
+        '-recent_count', 'name'
+    )[:limit or settings.TRENDING_SIZE]
+
+
+def rebuild():
+    """Пересобирает теги, хронологии и тренды по текстам постов."""
+    with transaction.atomic():
+        PostTag.objects.all().delete()
+        TagBucket.objects.all().delete()
+        Tag.objects.update(recent_count=0)
+        for post in Post.objects.only(
+            'pk', 'text', 'group_id', 'pub_date'
+        ).iterator():
+            sync(post)
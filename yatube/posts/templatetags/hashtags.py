@@ -0,0 +1,15 @@
+from django import template
+
+from posts import tags
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/trending_tags.html')
+def trending_tags():
+    """Самые популярные теги за окно трендов.
+
+    Счётчики ведутся при сохранении постов, так что здесь только
+    чтение по индексу без агрегации.
+    """
+    return {'tags': tags.trending()}
@@ -0,0 +1,46 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from posts import images
+
+register = template.Library()
+
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+PLACEHOLDER_COLOR = '#e9ecef'
+
+
+def _srcset(variants):
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for name, width, _ in variants
+    )
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post, sizes=CARD_SIZES):
+    """Картинка поста с ``srcset`` из заранее нарезанных вариантов.
+
+    Пока варианты не готовы, выводится обычная миниатюра. Размеры
+    и основной цвет, которым закрашено место под картинку до загрузки,
+    берутся из полей поста; размеры — по пропорциям карточки.
+    """
+    variants = post.variants if post.image else {}
+    context = {
+        'post': post,
+        'sizes': sizes,
+        'color': post.image_color or PLACEHOLDER_COLOR,
+    }
+    if post.image and post.image_width:
+        context['width'], context['height'] = images.card_size(
+            post.image_width
+        )
+    if 'jpeg' in variants:
+        name, width, height = variants['jpeg'][-1]
+        context.setdefault('width', width)
+        context.setdefault('height', height)
+        context.update(
+            src=default_storage.url(name),
+            srcset=_srcset(variants['jpeg']),
+            webp_srcset=_srcset(variants.get('webp', ())),
+        )
+    return context
@@ -0,0 +1,130 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import blobs, images
+from posts.models import ImageBlob, Post
+from posts.tests.constants import AUTHOR_USERNAME, POST_TEXT
+from tasks.models import Task
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEST_IMAGE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageBlobTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username=AUTHOR_USERNAME)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.author,
+            text=POST_TEXT,
+            image=SimpleUploadedFile(name=name, content=TEST_IMAGE),
+        )
+
+    def refs(self, name):
+        return ImageBlob.objects.get(name=name).refs
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки хранятся одним файлом со счётчиком ссылок."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertTrue(blobs.storage.is_content_name(name))
+        self.assertEqual(self.refs(name), 2)
+        first.delete()
+        self.assertEqual(self.refs(name), 1)
+        self.assertEqual(blobs.collect(timedelta()), [])
+        second.image = SimpleUploadedFile(
+            name='other.gif', content=TEST_IMAGE + b'\0'
+        )
+        second.save()
+        self.assertEqual(self.refs(name), 0)
+        self.assertEqual(blobs.collect(timedelta(hours=1)), [])
+        self.assertEqual(blobs.collect(timedelta()), [name])
+        self.assertFalse(blobs.storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_variants_follow_blob(self):
+        """Варианты нарезаются раз на картинку и удаляются вместе с ней."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        name = first.image.name
+        images.build(name)
+        images.build(name)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.variants, second.variants)
+        variants = [
+            variant for kind in first.variants.values()
+            for variant, _, _ in kind
+        ]
+        for variant in variants:
+            self.assertTrue(default_storage.exists(variant))
+        self.assertEqual(
+            len(default_storage.listdir(images.VARIANTS_DIR)[1]),
+            len(variants)
+        )
+        first.delete()
+        second.delete()
+        self.assertIn(name, blobs.collect(timedelta()))
+        for variant in variants:
+            self.assertFalse(default_storage.exists(variant))
+
+    def test_migrate_images_command(self):
+        """Команда переносит плоские файлы в хранилище по содержимому."""
+        flat = [
+            FileSystemStorage().save(
+                f'posts/flat{i}.gif', ContentFile(TEST_IMAGE)
+            )
+            for i in range(2)
+        ]
+        Post.objects.bulk_create(
+            Post(author=self.author, text=POST_TEXT, image=name)
+            for name in flat
+        )
+        images.build(flat[0])
+        old_variants = [
+            variant for variant, _, _ in Post.objects.get(
+                image=flat[0]
+            ).variants['jpeg']
+        ]
+        call_command('migrate_images', stdout=StringIO())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(blobs.storage.is_content_name(name))
+        self.assertEqual(self.refs(name), 2)
+        for old in flat:
+            self.assertFalse(blobs.storage.exists(old))
+        for variant in old_variants:
+            self.assertFalse(default_storage.exists(variant))
+        self.assertFalse(Post.objects.exclude(image_variants='').exists())
+        self.assertTrue(
+            Task.objects.filter(key=f'images.build:{name}').exists()
+        )
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.cards import PostCard
+from posts.models import Group, Post
+from posts.tests.constants import (AUTHOR_USERNAME, GROUP_DESCRIPTION,
+                                   GROUP_SLUG, GROUP_TITLE, INDEX_URL_NAME,
+                                   POST_TEXT)
+from yatube.settings import EXCERPT_LENGTH
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username=AUTHOR_USERNAME, first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.long_post = Post.objects.create(
+            author=cls.author,
+            text='слово ' * EXCERPT_LENGTH,
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text=POST_TEXT
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_cards(self):
+        """Лента строит карточки с выдержкой, автором и группой."""
+        page = self.client.get(reverse(INDEX_URL_NAME)).context['page_obj']
+        card, long_card = page
+        self.assertIsInstance(card, PostCard)
+        self.assertEqual(list(page), [self.post, self.long_post])
+        self.assertEqual(card.excerpt, POST_TEXT)
+        self.assertFalse(card.truncated)
+        self.assertEqual(card.author.get_full_name(), 'Лев Толстой')
+        self.assertEqual(card.group.slug, GROUP_SLUG)
+        self.assertEqual(card.image, self.post.image)
+        self.assertIsNone(long_card.group)
+        self.assertTrue(long_card.truncated)
+        self.assertLessEqual(len(long_card.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(long_card.excerpt.endswith('слово'))
+
+    def test_blank_excerpt(self):
+        """Выдержка из одних пробелов обрезается без ошибки."""
+        Post.objects.create(
+            author=self.author, text=' ' * EXCERPT_LENGTH + POST_TEXT
+        )
+        response = self.client.get(reverse(INDEX_URL_NAME))
+        card = response.context['page_obj'][0]
+        self.assertTrue(card.truncated)
+        self.assertEqual(card.excerpt, ' ' * EXCERPT_LENGTH)
+
+    def test_cards_have_no_dict(self):
+        """У карточек нет ``__dict__``: только поля из ``__slots__``."""
+        card = self.client.get(
+            reverse(INDEX_URL_NAME)
+        ).context['page_obj'][0]
+        for record in (card, card.author, card.group):
+            with self.subTest(record=type(record).__name__):
+                self.assertFalse(hasattr(record, '__dict__'))
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import counters
+from posts.models import AuthorCounter, Follow, Group, Post, SiteCounter
+from posts.tests.constants import (AUTHOR_USERNAME, GROUP_DESCRIPTION,
+                                   GROUP_SLUG, GROUP_TITLE, POST_TEXT,
+                                   USER_USERNAME)
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.other_group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=f'{GROUP_SLUG}-other',
+            description=GROUP_DESCRIPTION,
+        )
+
+    def assertCounts(self, author, group, other_group):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(
+            AuthorCounter.objects.get(author=self.author).posts_count, author
+        )
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.other_group.posts_count, other_group)
+
+    def test_counters_follow_create_edit_delete(self):
+        """Счётчики меняются при создании, переносе и удалении поста."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text=POST_TEXT
+        )
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertCounts(2, 1, 0)
+        post.group = self.other_group
+        post.save()
+        self.assertCounts(2, 0, 1)
+        Post.objects.get(pk=post.pk).delete()
+        self.assertCounts(1, 0, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет расхождения счётчиков."""
+        Post.objects.create(
+            author=self.author, group=self.group, text=POST_TEXT
+        )
+        AuthorCounter.objects.update(posts_count=10)
+        Group.objects.update(posts_count=10)
+        call_command('recount', stdout=StringIO())
+        self.assertCounts(1, 1, 0)
+
+    def test_total_and_feed_counters(self):
+        """Счётчики всех постов и ленты следуют за постами и подписками."""
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(counters.feed_posts(self.user), 1)
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertEqual(counters.total_posts(), 2)
+        self.assertEqual(counters.feed_posts(self.user), 2)
+        post.delete()
+        self.assertEqual(counters.total_posts(), 1)
+        self.assertEqual(counters.feed_posts(self.user), 1)
+        follow.delete()
+        self.assertEqual(counters.feed_posts(self.user), 0)
+
+    def test_recount_repairs_total_and_feeds(self):
+        """Команда recount исправляет счётчики всех постов и лент."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        AuthorCounter.objects.update(feed_count=10)
+        SiteCounter.objects.update(value=10)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(counters.total_posts(), 1)
+        self.assertEqual(counters.feed_posts(self.user), 1)
+
+    def test_deferred_fields_do_not_look_changed(self):
+        """Пост, загруженный через only(), не сдвигает счётчики."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text=POST_TEXT
+        )
+        for _ in range(2):
+            partial = Post.objects.only('text').get(pk=post.pk)
+            partial.text = f'{POST_TEXT} #тег'
+            partial.save()
+        self.assertCounts(1, 1, 0)
+        partial = Post.objects.only('text').get(pk=post.pk)
+        partial.group = self.other_group
+        partial.save()
+        self.assertCounts(1, 0, 1)
+        Post.objects.only('pk').get(pk=post.pk).delete()
+        self.assertCounts(0, 0, 0)
+        self.assertEqual(counters.total_posts(), 0)
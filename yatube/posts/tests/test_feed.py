@@ -0,0 +1,77 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from posts import counters, feed
+from posts.cards import values
+from posts.feed import FEED_KEYS, add_author, fan_out, feed_posts
+from posts.models import FeedItem, Follow, Post
+from posts.tests.constants import AUTHOR_USERNAME, POST_TEXT, USER_USERNAME
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.old_post = Post.objects.create(author=cls.author, text=POST_TEXT)
+
+    def test_follow_fills_feed(self):
+        """Подписка добавляет в ленту уже написанные посты автора."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(list(feed_posts(self.user)), [self.old_post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertEqual(
+            list(feed_posts(self.user)), [new_post, self.old_post]
+        )
+        self.assertFalse(feed_posts(self.author).exists())
+
+    def test_unfollow_clears_feed(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(feed_posts(self.user).exists())
+
+    def test_rebuild_feeds_command(self):
+        """Команда rebuild_feeds восстанавливает ленты по подпискам."""
+        Follow.objects.create(user=self.user, author=self.author)
+        FeedItem.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(list(feed_posts(self.user)), [self.old_post])
+
+    def test_overlapping_feed_keeps_count(self):
+        """Повторное добавление постов не сдвигает счётчик ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        add_author(self.user.pk, self.author.pk)
+        fan_out(self.old_post)
+        self.assertEqual(counters.feed_posts(self.user), 1)
+
+    def test_feed_walks_index_in_order(self):
+        """Лента читается по индексу без сортировки во временном дереве."""
+        sql, params = values(
+            feed_posts(self.user), FEED_KEYS
+        )[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor)
+        self.assertIn('feed_user_pub_date_post_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_rebuild_is_atomic(self):
+        """Упавшая пересборка оставляет ленты как были."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with mock.patch.object(feed, 'add_author', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                feed.rebuild()
+        self.assertEqual(list(feed_posts(self.user)), [self.old_post])
+        self.assertEqual(counters.feed_posts(self.user), 1)
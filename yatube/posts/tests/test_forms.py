@@ -1,12 +1,16 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts import uploads
 from posts.models import Group, Post
 from posts.tests.constants import (AUTHOR_USERNAME, GROUP_DESCRIPTION,
                                    GROUP_SLUG, GROUP_TITLE,
@@ -102,3 +106,69 @@ class PostFormTests(TestCase):
         self.assertEqual(
             Post.objects.get(id=self.group.id).group, self.group
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        self.client.force_login(self.author)
+
+    def post_image(self, size):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'blue').save(buffer, 'PNG')
+        return self.client.post(reverse(POST_CREATE_URL_NAME), data={
+            'text': POST_TEXT,
+            'image': SimpleUploadedFile('upload.png', buffer.getvalue()),
+        })
+
+    @override_settings(IMAGE_MAX_SIDE=400)
+    def test_upload_is_reencoded(self):
+        """Загруженная картинка пересжимается и уменьшается."""
+        self.post_image((1000, 500))
+        post = Post.objects.get(author=self.author)
+        self.assertEqual((post.image_width, post.image_height), (400, 200))
+        self.assertTrue(post.image.name.endswith('.png'))
+
+    def test_upload_limits(self):
+        """Слишком большие файлы и картинки отклоняются формой."""
+        cases = (
+            ({'IMAGE_UPLOAD_MAX_BYTES': 10}, 'too_large'),
+            ({'IMAGE_UPLOAD_MAX_PIXELS': 100}, 'too_many_pixels'),
+        )
+        for limits, code in cases:
+            with self.subTest(code=code), self.settings(**limits):
+                response = self.post_image((20, 20))
+                self.assertTrue(
+                    response.context['form'].has_error('image', code)
+                )
+        self.assertFalse(Post.objects.exists())
+
+    def test_upload_without_fields_limit(self):
+        """DATA_UPLOAD_MAX_MEMORY_SIZE = None снимает лимит запроса."""
+        with self.settings(DATA_UPLOAD_MAX_MEMORY_SIZE=None):
+            self.post_image((20, 20))
+        self.assertTrue(Post.objects.filter(author=self.author).exists())
+
+    def test_timeout_kills_only_stuck_worker(self):
+        """Зависшая обработка убивает свой процесс, а не соседние."""
+        def upload():
+            buffer = BytesIO()
+            Image.new('RGB', (20, 20), 'blue').save(buffer, 'PNG')
+            return SimpleUploadedFile('upload.png', buffer.getvalue())
+
+        busy = uploads._acquire()
+        self.addCleanup(uploads._idle.put, busy)
+        with mock.patch.object(
+            uploads, '_discard', wraps=uploads._discard
+        ) as discard:
+            with self.settings(IMAGE_UPLOAD_TIMEOUT=0):
+                with self.assertRaises(uploads.ImageRejected):
+                    uploads.normalize(upload())
+        (stuck,), _ = discard.call_args
+        self.assertIsNot(stuck, busy)
+        self.assertIsNotNone(stuck.process.exitcode)
+        self.assertTrue(busy.process.is_alive())
+        self.assertEqual(
+            uploads.normalize(upload()).content_type, 'image/png'
+        )
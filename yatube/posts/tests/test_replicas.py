@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.tests.constants import (AUTHOR_USERNAME, COMMENT_CREATE_URL_NAME,
+                                   COMMENT_TEXT, INDEX_URL_NAME,
+                                   POST_DETAIL_URL_NAME, POST_TEXT,
+                                   PROFILE_URL_NAME, USER_USERNAME)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTests(TestCase):
+    """Реплика — отдельная пустая база, то есть сильно отстающая."""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.post = Post.objects.create(author=cls.author, text=POST_TEXT)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.detail_url = reverse(
+            POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.pk}
+        )
+
+    def test_feeds_read_replica(self):
+        """Ленты читают посты с реплики, пользователей — с основной базы."""
+        response = self.client.get(reverse(INDEX_URL_NAME))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        response = self.client.get(
+            reverse(PROFILE_URL_NAME, kwargs={'username': AUTHOR_USERNAME})
+        )
+        self.assertEqual(response.context['author'], self.author)
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertEqual(self.client.get(self.detail_url).status_code, 404)
+
+    def test_recent_changes_read_primary(self):
+        """Пока реплика может отставать от изменения, читается основа."""
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        response = self.client.get(reverse(INDEX_URL_NAME))
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_session_pinned_after_write(self):
+        """После своей записи сессия читает с основной базы."""
+        self.client.post(
+            reverse(COMMENT_CREATE_URL_NAME, kwargs={'post_id': self.post.pk}),
+            {'text': COMMENT_TEXT},
+        )
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+        cache.clear()
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, COMMENT_TEXT)
+        self.assertEqual(Client().get(self.detail_url).status_code, 404)
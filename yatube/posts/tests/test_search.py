@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import search_posts, to_query
+from posts.tests.constants import AUTHOR_USERNAME
+from yatube.settings import NUM_OF_POSTS
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Коты, коты и ещё раз коты'
+        )
+        cls.cat = Post.objects.create(
+            author=cls.author, text='Пост про кота и собаку'
+        )
+        cls.dog = Post.objects.create(author=cls.author, text='Собаки')
+
+    def test_ranked_by_relevance(self):
+        """Находит формы слова без учёта регистра, точные — выше."""
+        self.assertEqual(
+            list(search_posts('КОТ')), [self.cats, self.cat]
+        )
+
+    def test_index_follows_posts(self):
+        """Индекс обновляется при правке, удалении и bulk_create."""
+        self.dog.text = 'Теперь про котов'
+        self.dog.save()
+        Post.objects.filter(pk=self.cat.pk).delete()
+        Post.objects.bulk_create(
+            [Post(author=self.author, text='Котлеты')]
+        )
+        self.assertEqual(
+            sorted(post.text for post in search_posts('кот')),
+            ['Котлеты', 'Коты, коты и ещё раз коты', 'Теперь про котов'],
+        )
+        self.assertFalse(search_posts('собаки').exists())
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 из ввода не ломают запрос."""
+        self.assertEqual(to_query('кот" OR (собак*'), '"кот"* "or"* "собак"*')
+        self.assertIsNone(to_query('"*()'))
+        self.assertFalse(search_posts('"*()').exists())
+        self.assertEqual(list(search_posts('NEAR(кот')), [])
+
+    def test_search_page_paginated_by_cursor(self):
+        """Страницы поиска идут по курсору и сохраняют запрос."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Кот номер {i}')
+            for i in range(NUM_OF_POSTS)
+        )
+        client = Client()
+        url = reverse('posts:search')
+        first = client.get(url, {'q': 'кот'})
+        page = first.context['page_obj']
+        self.assertEqual(len(page), NUM_OF_POSTS)
+        self.assertEqual(page[0], self.cats)
+        self.assertContains(first, '?q=%D0%BA%D0%BE%D1%82&cursor=')
+        second = client.get(url, {'q': 'кот', 'cursor': page.next_cursor})
+        rest = list(second.context['page_obj'])
+        self.assertEqual(len(rest), 2)
+        self.assertFalse(set(rest) & set(page))
+
+    def test_empty_query(self):
+        """Без запроса страница показывает только форму."""
+        response = Client().get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
+        self.assertTemplateUsed(response, 'posts/search.html')
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по тому же индексу."""
+        admin = User.objects.create_superuser('admin', '', 'password')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'коты'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.cats}
+        )
+
+    def test_bench_search_command(self):
+        """Бенчмарк сравнивает LIKE и FTS5 и откатывает изменения."""
+        out = StringIO()
+        call_command('bench_search', posts=100, stdout=out)
+        self.assertIn('FTS5', out.getvalue())
+        self.assertEqual(Post.objects.count(), 3)
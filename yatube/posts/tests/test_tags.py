@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import tags
+from posts.models import Group, Post, PostTag, Tag, TagBucket
+from posts.tests.constants import (AUTHOR_USERNAME, GROUP_DESCRIPTION,
+                                   GROUP_SLUG, GROUP_TITLE)
+from yatube.settings import NUM_OF_POSTS, TRENDING_HOURS
+
+User = get_user_model()
+
+
+class TagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Про #Котов и #собак, но не про a#b'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.get(pk=self.post.pk)
+
+    def counts(self):
+        return dict(Tag.objects.values_list('name', 'recent_count'))
+
+    def test_parse(self):
+        """Теги разбираются без учёта регистра и без повторов."""
+        self.assertEqual(
+            tags.parse('#Кот и #кот, ##нет, #да_2 и почта a#b'),
+            {'кот', 'да_2'},
+        )
+
+    def test_tags_follow_text(self):
+        """Теги и тренды следуют за текстом и удалением поста."""
+        self.assertEqual(self.counts(), {'котов': 1, 'собак': 1})
+        self.post.text = 'Только про #котов и #птиц'
+        self.post.save()
+        self.assertEqual(
+            tags.names(self.post), {'котов', 'птиц'}
+        )
+        self.assertEqual(
+            self.counts(), {'котов': 1, 'собак': 0, 'птиц': 1}
+        )
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertFalse(PostTag.objects.exists())
+        self.assertEqual(
+            self.counts(), {'котов': 0, 'собак': 0, 'птиц': 0}
+        )
+
+    def test_group_change_moves_timeline(self):
+        """Смена группы поста переносит его в хронологию группы."""
+        self.post.group = self.group
+        self.post.save()
+        self.assertEqual(
+            list(tags.tagged_posts(Tag.objects.get(name='котов'), self.group)),
+            [self.post],
+        )
+
+    def test_tag_pages(self):
+        """Страница тега листается курсором, в том числе внутри группы."""
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f'#котов {i}')
+            for i in range(NUM_OF_POSTS)
+        )
+        call_command('rebuild_tags', stdout=StringIO())
+        client = Client()
+        page = client.get(
+            reverse('posts:tag_list', kwargs={'name': 'КОТОВ'})
+        ).context['page_obj']
+        self.assertEqual(len(page), NUM_OF_POSTS)
+        rest = client.get(
+            reverse('posts:tag_list', kwargs={'name': 'котов'}),
+            {'cursor': page.next_cursor},
+        ).context['page_obj']
+        self.assertEqual(list(rest), [self.post])
+        in_group = client.get(reverse(
+            'posts:group_tag_list',
+            kwargs={'slug': GROUP_SLUG, 'name': 'котов'},
+        )).context['page_obj']
+        self.assertNotIn(self.post, in_group)
+        self.assertEqual(self.counts()['котов'], NUM_OF_POSTS + 1)
+
+    def test_tag_page_query_count(self):
+        """Страница тега читает хронологию одним запросом."""
+        with self.assertNumQueries(2):
+            Client().get(reverse('posts:tag_list', kwargs={'name': 'котов'}))
+
+    def test_trending_window_slides(self):
+        """Корзины, выпавшие из окна, вычитаются из трендов."""
+        self.assertEqual(
+            [tag.name for tag in tags.trending()], ['котов', 'собак']
+        )
+        later = timezone.now() + timedelta(hours=TRENDING_HOURS)
+        self.assertTrue(tags.expire(later))
+        self.assertFalse(TagBucket.objects.exists())
+        self.assertFalse(tags.trending().exists())
+        self.assertFalse(tags.expire(later))
+
+    def test_trending_widget(self):
+        """Главная страница показывает тренды."""
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(
+            response, reverse('posts:tag_list', kwargs={'name': 'котов'})
+        )
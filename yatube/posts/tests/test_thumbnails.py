@@ -0,0 +1,196 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from posts import images, thumbnails
+from posts.models import Post
+from posts.thumbnail_kvstore import KVStore
+from posts.tests.constants import (AUTHOR_USERNAME, INDEX_URL_NAME,
+                                   POST_DETAIL_URL_NAME, POST_TEXT)
+from tasks import queue
+from tasks.models import Task
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEST_IMAGE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def create_post(name='test_image.gif', content=TEST_IMAGE,
+                username=AUTHOR_USERNAME):
+    return Post.objects.create(
+        author=User.objects.create_user(username=username),
+        text=POST_TEXT,
+        image=SimpleUploadedFile(name=name, content=content),
+    )
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Промахи прошлых тестов не дошли до очереди: их откатили.
+        thumbnails._missed.clear()
+        del thumbnails._missed_queue[:]
+        self.post = create_post()
+
+    def test_placeholder_until_generated(self):
+        """Пока воркер не нарезал миниатюру, шаблоны выводят заглушку."""
+        urls = (
+            reverse(INDEX_URL_NAME),
+            reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    content = self.client.get(url).content.decode()
+                self.assertIn('data:image/svg+xml', content)
+                self.assertNotIn('/media/cache/', content)
+                self.assertFalse(
+                    any('tasks_task' in query['sql'] for query in queries)
+                )
+        thumbnails.schedule_missed()
+        self.assertEqual(Task.objects.filter(
+            name='posts.thumbnails.generate'
+        ).count(), 1)
+        task = queue.claim()
+        self.assertEqual(task.name, 'posts.thumbnails.generate')
+        queue.execute(task)
+        self.assertEqual(
+            list(Task.objects.values_list('name', flat=True)),
+            ['posts.images.build'],
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertNotIn('data:image/svg+xml', content)
+                self.assertIn('/media/cache/', content)
+
+    def test_kvstore_write_behind(self):
+        """Метаданные пишутся в кеш сразу, а в базу — при сбросе."""
+        store, key = KVStore(), 'sorl-thumbnail||image||test'
+        store._set_raw(key, 'value')
+        self.assertEqual(cache.get(key), 'value')
+        self.assertFalse(KVStoreModel.objects.filter(key=key).exists())
+        store.flush()
+        self.assertTrue(KVStoreModel.objects.filter(key=key).exists())
+        cache.delete(key)
+        self.assertEqual(store._get_raw(key), 'value')
+        self.assertEqual(cache.get(key), 'value')
+
+    def test_pages_skip_kvstore_table(self):
+        """Страницы с картинками не читают таблицу метаданных sorl."""
+        geometry_string, options = thumbnails.POST_THUMBNAILS[0]
+        thumbnails.generate(self.post.image.name, geometry_string, options)
+        default.kvstore.flush()
+        for clear_cache in (False, True):
+            if clear_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse(INDEX_URL_NAME))
+            self.assertFalse(
+                any('thumbnail_kvstore' in query['sql'] for query in queries)
+            )
+
+    def test_image_meta_on_upload(self):
+        """Размеры, цвет и blurhash считаются при загрузке картинки."""
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 600), 'red').save(buffer, 'PNG')
+        post = create_post('large.png', buffer.getvalue(), 'other')
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (1200, 600))
+        self.assertEqual(post.image_color, '#ff0000')
+        self.assertTrue(post.image_blurhash)
+        content = self.client.get(reverse(INDEX_URL_NAME)).content.decode()
+        self.assertIn('width="960" height="339"', content)
+        self.assertIn('style="background-color: #ff0000"', content)
+        self.assertIn(f'data-blurhash="{post.image_blurhash}"', content)
+
+    def test_card_size_from_stored_meta(self):
+        """Размеры карточки берутся из полей поста, а не из миниатюры."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=700, image_height=350
+        )
+        content = self.client.get(reverse(INDEX_URL_NAME)).content.decode()
+        self.assertIn('width="640" height="226"', content)
+
+    def test_variants_srcset(self):
+        """Готовые варианты картинки выводятся через srcset."""
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 600), 'red').save(buffer, 'PNG')
+        post = create_post('large.png', buffer.getvalue(), 'other')
+        images.build(post.image.name)
+        post.refresh_from_db()
+        self.assertEqual(
+            [width for _, width, _ in post.variants['jpeg']], [320, 640, 960]
+        )
+        self.assertEqual(post.variants['jpeg'][-1][1:], [960, 339])
+        content = self.client.get(reverse(INDEX_URL_NAME)).content.decode()
+        self.assertIn(' 960w"', content)
+        self.assertEqual(
+            '<source type="image/webp"' in content, 'webp' in post.variants
+        )
+        post.image = SimpleUploadedFile(name='other.gif', content=TEST_IMAGE)
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.variants, {})
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageCommandTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        # bulk_create не шлёт сигналов, и фоновая очередь не режет
+        # ту же картинку наперегонки с командой.
+        Post.objects.bulk_create([Post(
+            author=User.objects.create_user(username=AUTHOR_USERNAME),
+            text=POST_TEXT,
+            image=default_storage.save(
+                'posts/test_image.gif', ContentFile(TEST_IMAGE)
+            ),
+        )])
+
+    def test_generate_thumbnails_command(self):
+        """Команда нарезает миниатюры и варианты загруженных картинок."""
+        call_command('generate_thumbnails', stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(len(post.variants['jpeg']), 1)
+        geometry_string, options = thumbnails.POST_THUMBNAILS[0]
+        self.assertNotIsInstance(
+            get_thumbnail(post.image, geometry_string, **options),
+            thumbnails.Placeholder
+        )
+
+    def test_fill_image_meta_command(self):
+        """Команда заполняет размеры и цвет уже загруженных картинок."""
+        call_command('fill_image_meta', '--workers', '2', stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        self.assertTrue(post.image_blurhash)
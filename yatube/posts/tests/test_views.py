@@ -8,9 +8,12 @@ from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts import counters
 from posts.models import Comment, Follow, Group, Post
 from posts.tests.constants import (AUTHOR_USERNAME, COMMENT_CREATE_URL_NAME,
                                    COMMENT_TEXT, GROUP_DESCRIPTION,
@@ -22,7 +25,8 @@ from posts.tests.constants import (AUTHOR_USERNAME, COMMENT_CREATE_URL_NAME,
                                    POST_EDIT_URL_NAME, POST_TEXT,
                                    PROFILE_TEMPLATE, PROFILE_URL_NAME,
                                    USER_USERNAME)
-from yatube.settings import NUM_OF_POSTS
+from posts.utils import KeysetPaginator
+from yatube.settings import ESTIMATE_PAGES, NUM_OF_POSTS
 
 User = get_user_model()
 
@@ -225,17 +229,84 @@ class PostViewTests(TestCase):
         self.assertTrue(exists)
 
     def test_cache_index(self):
-        """Проверка кеширования главной страницы index."""
-        post = Post.objects.get(pk=self.post.id)
+        """Главная страница кешируется до изменения постов."""
         url = reverse('posts:index')
         response_old = self.client.get(url).content
+        Post.objects.filter(pk=self.post.id).update(text='Без сигналов')
+        response_cached = self.client.get(url).content
+        post = Post.objects.get(pk=self.post.id)
         post.text = 'Измененный текст'
         post.save()
         response_new = self.client.get(url).content
-        cache.clear()
-        response_change = self.client.get(url).content
-        self.assertEqual(response_old, response_new)
-        self.assertNotEqual(response_change, response_new)
+        self.assertEqual(response_old, response_cached)
+        self.assertNotEqual(response_new, response_cached)
+        self.assertIn(post.text, response_new.decode())
+
+    def test_cache_group_and_profile(self):
+        """Первые страницы группы и профиля сбрасываются новым постом."""
+        urls = (
+            reverse(GROUP_LIST_URL_NAME, kwargs={'slug': self.group.slug}),
+            reverse(PROFILE_URL_NAME, kwargs={'username': AUTHOR_USERNAME}),
+        )
+        for url in urls:
+            self.client.get(url)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост'
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('Новый пост', response.content.decode())
+
+    def test_cache_group_rename(self):
+        """Переименование группы сбрасывает профили с её постами."""
+        url = reverse(PROFILE_URL_NAME, kwargs={'username': AUTHOR_USERNAME})
+        self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        self.assertContains(self.client.get(url), 'Новое название')
+
+    def test_cache_keeps_user_header(self):
+        """Из кеша каждый видит свою шапку, а тело страницы общее."""
+        url = reverse(INDEX_URL_NAME)
+        self.author_post.get(url)
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(url)
+        content = response.content.decode()
+        self.assertIn(f'Пользователь: {self.user.username}', content)
+        self.assertNotIn(f'Пользователь: {self.author.username}', content)
+        self.assertIn(POST_TEXT, content)
+        content = self.client.get(url).content.decode()
+        self.assertNotIn('Пользователь:', content)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content.decode(), content)
+
+    def test_conditional_get(self):
+        """Неизменившаяся страница отдаёт 304 без запросов к базе."""
+        urls = (
+            reverse(INDEX_URL_NAME),
+            reverse(GROUP_LIST_URL_NAME, kwargs={'slug': self.group.slug}),
+            reverse(PROFILE_URL_NAME, kwargs={'username': AUTHOR_USERNAME}),
+            reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_conditional_get_after_change(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.id})
+        etag = self.authorized_client.get(url)['ETag']
+        self.authorized_client.post(
+            reverse(COMMENT_CREATE_URL_NAME, kwargs={'post_id': self.post.id}),
+            data={'text': COMMENT_TEXT},
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
 
     def test_profile_follow(self):
         """Проверка подписки на других пользователей."""
@@ -310,6 +381,7 @@ class PaginatorViewsTest(TestCase):
                 ) for i in range(NUM_OF_POSTS + 1)
             ]
         )
+        counters.recount()
 
     def test_paginator(self):
         """Шаблон страниц с Paginator сформирован с правильным контекстом."""
@@ -338,3 +410,223 @@ class PaginatorViewsTest(TestCase):
                 self.assertQuerysetEqual(
                     page_obj, queryset, transform=lambda x: x
                 )
+
+    def test_paginator_cursor_pages(self):
+        """Курсоры ведут на следующую и предыдущую страницы."""
+        url = reverse(INDEX_URL_NAME)
+        first_page = self.client.get(url).context['page_obj']
+        self.assertIsNone(first_page.previous_cursor)
+        second_page = self.client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(second_page.number, 2)
+        self.assertEqual(
+            list(second_page), list(Post.objects.all()[NUM_OF_POSTS:])
+        )
+        self.assertIsNone(second_page.next_cursor)
+        back_page = self.client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_paginator_page_number_fallback(self):
+        """Старые ссылки ?page=N продолжают работать."""
+        url = reverse(INDEX_URL_NAME)
+        expected = {
+            '2': list(Post.objects.all()[NUM_OF_POSTS:]),
+            'abc': list(Post.objects.all()[:NUM_OF_POSTS]),
+            '100': list(Post.objects.all()[NUM_OF_POSTS:]),
+        }
+        for page, posts in expected.items():
+            with self.subTest(page=page):
+                response = self.client.get(url, {'page': page})
+                self.assertEqual(list(response.context['page_obj']), posts)
+
+
+class PaginatorCountTests(TestCase):
+    """Число страниц берётся из счётчиков, а без них оценивается."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(NUM_OF_POSTS * 2 + 1):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'{POST_TEXT} {i}'
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_counted_pages(self):
+        """Ленты с счётчиками знают число страниц без COUNT."""
+        urls = (
+            reverse(INDEX_URL_NAME),
+            reverse(GROUP_LIST_URL_NAME, kwargs={'slug': GROUP_SLUG}),
+            reverse(PROFILE_URL_NAME, kwargs={'username': AUTHOR_USERNAME}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(url)
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries
+                ))
+                self.assertEqual(
+                    response.context['page_obj'].paginator.num_pages, 3
+                )
+                self.assertContains(response, 'из 3')
+                last_page = self.authorized_client.get(url, {
+                    'cursor': response.context['page_obj'].last_cursor
+                }).context['page_obj']
+                self.assertEqual(last_page.number, 3)
+                self.assertEqual(
+                    list(last_page),
+                    list(self.authorized_client.get(
+                        url, {'page': 3}
+                    ).context['page_obj'])
+                )
+                self.assertEqual(len(last_page), 1)
+                back_page = self.authorized_client.get(url, {
+                    'cursor': last_page.previous_cursor
+                }).context['page_obj']
+                self.assertEqual(back_page.number, 2)
+                self.assertEqual(len(back_page), NUM_OF_POSTS)
+
+    def test_drifted_counter(self):
+        """Завышенный счётчик не ведёт на пустую страницу."""
+        paginator = KeysetPaginator(
+            Post.objects.all(), NUM_OF_POSTS, counter=lambda: 1000
+        )
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.get_page(50)
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(list(page), list(Post.objects.all()[20:]))
+        self.assertFalse(page.has_next())
+
+    def test_estimated_pages(self):
+        """Без счётчика COUNT ограничен, а страниц становится «много»."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:search'), {'q': POST_TEXT}
+            )
+        self.assertContains(response, 'из 3')
+        counts = [
+            query['sql'] for query in queries if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT', counts[0])
+        paginator = KeysetPaginator(Post.objects.all(), 1)
+        self.assertEqual(paginator.num_pages, ESTIMATE_PAGES)
+        self.assertTrue(paginator.estimated)
+
+
+class KeysetPlanTests(TestCase):
+    """Курсор ограничивает диапазон индекса, а не читает его с начала."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text=POST_TEXT
+        )
+
+    def test_cursor_uses_index_range(self):
+        values = [self.post.pub_date, self.post.pk]
+        querysets = {
+            'index': Post.objects.all(),
+            'group': Post.objects.filter(group=self.group),
+            'profile': Post.objects.filter(author=self.author),
+        }
+        for name, queryset in querysets.items():
+            paginator = KeysetPaginator(queryset, NUM_OF_POSTS)
+            for keyset_filter in (paginator._after, paginator._before):
+                with self.subTest(
+                    page=name, direction=keyset_filter.__name__
+                ):
+                    sql, params = paginator.object_list.filter(
+                        keyset_filter(values)
+                    )[:NUM_OF_POSTS + 1].query.sql_with_params()
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                        plan = ' '.join(row[-1] for row in cursor)
+                    self.assertIn('SEARCH', plan)
+                    self.assertRegex(plan, r'pub_date[<>]\?')
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(NUM_OF_POSTS):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'{POST_TEXT} {i}'
+            )
+        cls.post = post
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=User.objects.create_user(username=f'commenter{i}'),
+                text=COMMENT_TEXT,
+            ) for i in range(NUM_OF_POSTS)
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_views_query_count(self):
+        """Ленты и страница поста выполняют фиксированное число запросов."""
+        cases = (
+            (self.client, reverse(INDEX_URL_NAME), 2),
+            (
+                self.client,
+                reverse(GROUP_LIST_URL_NAME, kwargs={'slug': GROUP_SLUG}),
+                2,
+            ),
+            (
+                self.client,
+                reverse(
+                    PROFILE_URL_NAME, kwargs={'username': AUTHOR_USERNAME}
+                ),
+                2,
+            ),
+            (
+                self.client,
+                reverse(
+                    POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.id}
+                ),
+                2,
+            ),
+            (self.authorized_client, reverse('posts:follow_index'), 3),
+        )
+        for client, url, queries in cases:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,84 @@
+"""Метаданные миниатюр sorl в кеше проекта с отложенной записью в базу.
+
+Кеш — основное хранилище: запросы страниц читают только его и при
+промахе базу не трогают, а получают заглушку и ставят миниатюру
+в фоновую очередь (см. ``posts.thumbnails``). Фоновые задачи при
+промахе читают таблицу ``thumbnail_kvstore``, которая остаётся
+запасной копией. Записи в неё копятся в памяти и сбрасываются
+одной транзакцией в фоновом пуле, не блокируя SQLite на каждую
+миниатюру.
+"""
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import thumbnails
+
+FLUSH_BATCH_SIZE = 500
+
+
+class KVStore(KVStoreBase):
+    def __init__(self):
+        super().__init__()
+        self._pending = {}
+        self._pending_guard = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _get_raw(self, key):
+        value = cache.get(key)
+        if value is not None or thumbnails.lookup_only():
+            return value
+        with self._pending_guard:
+            if key in self._pending:
+                return self._pending[key]
+        value = KVStoreModel.objects.filter(key=key).values_list(
+            'value', flat=True
+        ).first()
+        if value is not None:
+            cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+        return value
+
+    def _set_raw(self, key, value):
+        cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+        self._write_behind({key: value})
+
+    def _delete_raw(self, *keys):
+        cache.delete_many(keys)
+        self._write_behind(dict.fromkeys(keys))
+
+    def _find_keys_raw(self, prefix):
+        self.flush()
+        return KVStoreModel.objects.filter(
+            key__startswith=prefix
+        ).values_list('key', flat=True)
+
+    def _write_behind(self, changes):
+        with self._pending_guard:
+            self._pending.update(changes)
+        thumbnails.background(self.flush)
+
+    def flush(self):
+        """Записывает накопленные изменения в базу."""
+        with self._flush_lock:
+            with self._pending_guard:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            keys = list(pending)
+            with transaction.atomic():
+                for start in range(0, len(keys), FLUSH_BATCH_SIZE):
+                    KVStoreModel.objects.filter(
+                        key__in=keys[start:start + FLUSH_BATCH_SIZE]
+                    ).delete()
+                KVStoreModel.objects.bulk_create(
+                    [
+                        KVStoreModel(key=key, value=value)
+                        for key, value in pending.items()
+                        if value is not None
+                    ],
+                    batch_size=FLUSH_BATCH_SIZE,
+                )
@@ -0,0 +1,230 @@
+"""Миниатюры постов, которые режутся в фоне, а не во время запроса.
+
+Бэкенд sorl отдаёт готовую миниатюру из своего хранилища ключей,
+а при промахе сразу возвращает прозрачную заглушку того же размера.
+Нарезку ставит в очередь задач сохранение поста; промахи при
+отрисовке страниц в базу не пишут, а копятся в памяти процесса,
+и их ставит в очередь фоновый пул. Когда воркер нарежет миниатюру,
+страницы с постом помечаются устаревшими, и кеш страниц перестаёт
+отдавать заглушку.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import base, default
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+
+from core import timing
+from tasks.queue import enqueue
+
+from . import cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Миниатюры, которые выводят шаблоны постов: геометрия и параметры
+# должны совпадать с тегами {% thumbnail %}.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+    'height="{height}"/>'
+)
+
+_state = threading.local()
+_executor = None
+_executor_guard = threading.Lock()
+_pending = set()
+_pending_guard = threading.Lock()
+# Промахи отрисовки: ключ миниатюры — когда его можно запросить снова.
+_missed = {}
+_missed_queue = []
+_missed_guard = threading.Lock()
+MISS_RETRY = 60
+
+
+class Placeholder(DummyImageFile):
+    """Прозрачный прямоугольник размера миниатюры в data URI.
+
+    Место под картинку закрашивает фон тега ``img`` в шаблоне.
+    """
+
+    @property
+    def url(self):
+        svg = PLACEHOLDER_SVG.format(width=self.x, height=self.y)
+        return 'data:image/svg+xml,' + quote(svg)
+
+
+class NotReady(Exception):
+    pass
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    """Бэкенд sorl, который не нарезает миниатюры во время запроса."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with timing.measure('thumb'):
+            return self._get_thumbnail(file_, geometry_string, options)
+
+    def _get_thumbnail(self, file_, geometry_string, options):
+        if not file_ or getattr(_state, 'generating', False):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        _state.lookup_only = True
+        try:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        except NotReady:
+            request(str(file_), geometry_string, options)
+            return Placeholder(geometry_string)
+        finally:
+            _state.lookup_only = False
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        name = super()._get_thumbnail_filename(
+            source, geometry_string, options
+        )
+        if lookup_only() and not default.kvstore.get(
+            ImageFile(name, default.storage)
+        ):
+            raise NotReady(name)
+        return name
+
+
+def lookup_only():
+    """Идёт ли поиск миниатюры во время запроса, без нарезки."""
+    return getattr(_state, 'lookup_only', False)
+
+
+def source(name):
+    """Исходная картинка поста по имени — в хранилище поля ``image``."""
+    return ImageFile(name, Post.image.field.storage)
+
+
+def _get_executor():
+    global _executor
+    with _executor_guard:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def background(func, *args):
+    """Выполняет ``func(*args)`` в фоновом пуле после коммита.
+
+    Одинаковые задачи, уже стоящие в очереди, повторно не ставятся.
+    """
+    task = (func, args)
+
+    def submit():
+        with _pending_guard:
+            if task in _pending:
+                return
+            _pending.add(task)
+        _get_executor().submit(_run, task)
+
+    transaction.on_commit(submit)
+
+
+def drain():
+    """Дожидается фоновых задач и останавливает пул.
+
+    Следующая задача запустит пул заново. Нужно перед тем, как
+    очищать базу, в которую задачи ещё пишут, например между тестами.
+    """
+    global _executor
+    with _executor_guard:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _run(task):
+    func, args = task
+    with _pending_guard:
+        _pending.discard(task)
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s%s не удалась', func, args)
+    finally:
+        close_old_connections()
+
+
+def thumbnail_key(name, geometry_string, options):
+    return 'thumbnail:' + tokey(name, geometry_string, serialize(options))
+
+
+def schedule(name, geometry_string, options):
+    """Ставит нарезку миниатюры в очередь задач."""
+    enqueue(
+        generate, name, geometry_string, options,
+        key=thumbnail_key(name, geometry_string, options),
+    )
+
+
+def request(name, geometry_string, options):
+    """Просит нарезать миниатюру, которой не нашлось при отрисовке.
+
+    Один и тот же ключ запрашивается не чаще раза в ``MISS_RETRY``
+    секунд, а в очередь задач промахи ставит фоновый пул.
+    """
+    key = thumbnail_key(name, geometry_string, options)
+    now = time.monotonic()
+    with _missed_guard:
+        if _missed.get(key, 0) > now:
+            return
+        _missed[key] = now + MISS_RETRY
+        _missed_queue.append((name, geometry_string, options))
+    background(schedule_missed)
+
+
+def schedule_missed():
+    """Ставит в очередь задач накопленные промахи одной транзакцией."""
+    now = time.monotonic()
+    with _missed_guard:
+        missed = _missed_queue[:]
+        del _missed_queue[:]
+        for key, retry_at in list(_missed.items()):
+            if retry_at <= now:
+                del _missed[key]
+    if missed:
+        with transaction.atomic():
+            for name, geometry_string, options in missed:
+                schedule(name, geometry_string, options)
+
+
+def schedule_post(post):
+    """Ставит в очередь все миниатюры картинки поста."""
+    if post.image:
+        for geometry_string, options in POST_THUMBNAILS:
+            schedule(post.image.name, geometry_string, options)
+
+
+def generate(name, geometry_string, options):
+    """Нарезает миниатюру и сбрасывает кеш страниц с этой картинкой."""
+    _state.generating = True
+    try:
+        thumbnail = default.backend.get_thumbnail(
+            source(name), geometry_string, **options
+        )
+    finally:
+        _state.generating = False
+    refresh_pages(name)
+    return thumbnail
+
+
+def refresh_pages(name):
+    """Сбрасывает кеш страниц с постами, у которых эта картинка."""
+    from .signals import post_scopes
+
+    for post in Post.objects.filter(image=name).select_related('author'):
+        cache.bump(f'post:{post.pk}', *post_scopes(post, post.group_id))
@@ -0,0 +1,236 @@
+"""Приём картинок постов с ограничением памяти, диска и пикселей.
+
+Загрузка сразу пишется во временный файл, и байты сверх
+``IMAGE_UPLOAD_MAX_BYTES`` не сохраняются. Форма проверяет только
+заголовок картинки, а декодирование и пересжатие идут в отдельном
+пуле процессов с ограниченной памятью: бомба-декомпрессор роняет
+процесс пула, а не веб-воркер. Срок ``IMAGE_UPLOAD_TIMEOUT`` считается
+от передачи задания процессу, без ожидания свободного, и не уложившийся
+в него процесс убивается и заменяется новым — чужие загрузки в других
+процессах это не задевает.
+"""
+import os
+import tempfile
+from multiprocessing import get_context
+from queue import LifoQueue
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'JPEG': ('.jpg', 'image/jpeg', {'quality': 85, 'optimize': True}),
+    'PNG': ('.png', 'image/png', {'optimize': True}),
+    'GIF': ('.gif', 'image/gif', {}),
+    'WEBP': ('.webp', 'image/webp', {'quality': 85}),
+}
+
+_idle = LifoQueue()
+_started = 0
+_pool_guard = Lock()
+
+
+class ImageRejected(Exception):
+    pass
+
+
+class WorkerLost(Exception):
+    """Процесс обработки упал или не уложился в срок."""
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет файлы на диск и не сохраняет ничего сверх лимита.
+
+    Слишком большой файл помечается ``too_large``: остаток потока
+    дочитывается и отбрасывается, а форма сообщает об ошибке.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        # Запрос длиннее лимита файла и обычных полей вместе можно
+        # не сохранять вовсе. DATA_UPLOAD_MAX_MEMORY_SIZE = None
+        # снимает лимит с обычных полей, а с ним и с запроса.
+        fields_limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        self.request_too_large = fields_limit is not None and (
+            content_length > settings.IMAGE_UPLOAD_MAX_BYTES + fields_limit
+        )
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.too_large = getattr(self, 'request_too_large', False)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.too_large:
+            return None
+        if start + len(raw_data) > settings.IMAGE_UPLOAD_MAX_BYTES:
+            self.too_large = True
+            self.file.truncate(0)
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.too_large = self.too_large
+        return file
+
+
+def _limit_memory(limit):
+    try:
+        import resource
+    except ImportError:
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _serve(connection, memory_limit):
+    """Цикл процесса обработки: задание из канала, ответ в канал."""
+    _limit_memory(memory_limit)
+    connection.send(None)
+    while True:
+        try:
+            args = connection.recv()
+        except EOFError:
+            return
+        try:
+            reply = True, reencode(*args)
+        except Exception as error:
+            reply = False, error
+        connection.send(reply)
+
+
+class Worker:
+    """Процесс обработки картинок с каналом для заданий."""
+
+    def __init__(self):
+        context = get_context('spawn')
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(child, settings.IMAGE_WORKER_MEMORY),
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        # Запуск процесса не входит в срок обработки.
+        try:
+            self.connection.recv()
+        except EOFError:
+            self.stop()
+            raise WorkerLost('процесс обработки не запустился')
+
+    def run(self, args, timeout):
+        """Выполняет задание; срок считается только с его отправки.
+
+        Возвращает пару: успех и результат или исключение из процесса.
+        """
+        try:
+            self.connection.send(args)
+            if self.connection.poll(timeout):
+                return self.connection.recv()
+        except (EOFError, OSError):
+            raise WorkerLost('процесс обработки упал')
+        raise WorkerLost('обработка не уложилась во время')
+
+    def stop(self):
+        self.connection.close()
+        self.process.terminate()
+        self.process.join()
+
+
+def _acquire():
+    """Свободный процесс обработки; ждёт, если заняты все.
+
+    Ожидание свободного процесса не входит в срок обработки.
+    """
+    global _started
+    with _pool_guard:
+        start = _idle.empty() and _started < settings.IMAGE_UPLOAD_WORKERS
+        if start:
+            _started += 1
+    if not start:
+        return _idle.get()
+    try:
+        return Worker()
+    except Exception:
+        _discard(None)
+        raise
+
+
+def _discard(worker):
+    """Убивает процесс обработки, освобождая место для нового."""
+    global _started
+    if worker is not None:
+        worker.stop()
+    with _pool_guard:
+        _started -= 1
+
+
+def reencode(source, target, max_pixels, max_side):
+    """Декодирует картинку и сохраняет её заново без метаданных.
+
+    Выполняется в процессе пула. Картинка поворачивается по EXIF
+    и уменьшается до ``max_side`` по большей стороне. Возвращает
+    формат и размер результата.
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(source) as image:
+        image_format = image.format
+        if image_format not in FORMATS:
+            raise ImageRejected(image_format)
+        image.draft(image.mode, (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        _, _, options = FORMATS[image_format]
+        image.save(target, image_format, **options)
+        return image_format, image.size
+
+
+def normalize(upload):
+    """Пересжимает загруженную картинку в пуле процессов.
+
+    Возвращает новый ``UploadedFile`` во временном файле или
+    бросает ``ImageRejected``.
+    """
+    source = None
+    if hasattr(upload, 'temporary_file_path'):
+        path = upload.temporary_file_path()
+    else:
+        source = tempfile.NamedTemporaryFile(suffix='.upload')
+        for chunk in upload.chunks():
+            source.write(chunk)
+        source.flush()
+        path = source.name
+    target = tempfile.NamedTemporaryFile(suffix='.upload')
+    worker = _acquire()
+    try:
+        ok, result = worker.run(
+            (path, target.name,
+             settings.IMAGE_UPLOAD_MAX_PIXELS, settings.IMAGE_MAX_SIDE),
+            timeout=settings.IMAGE_UPLOAD_TIMEOUT,
+        )
+    except WorkerLost as error:
+        # Упавший или зависший процесс заменяется новым, остальные
+        # продолжают свои задания.
+        _discard(worker)
+        target.close()
+        raise ImageRejected(error)
+    finally:
+        if source is not None:
+            source.close()
+    _idle.put(worker)
+    if not ok:
+        target.close()
+        if isinstance(result, (OSError, ValueError, ImageRejected,
+                               Image.DecompressionBombError, MemoryError)):
+            raise ImageRejected(result)
+        raise result
+    image_format, _ = result
+    extension, content_type, _ = FORMATS[image_format]
+    target.seek(0, os.SEEK_END)
+    size = target.tell()
+    target.seek(0)
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    return UploadedFile(
+        target, name=name, content_type=content_type, size=size
+    )
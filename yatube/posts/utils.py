@@ -1,10 +1,205 @@
-from django.core.paginator import Paginator
+from django.core import signing
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-from yatube.settings import NUM_OF_POSTS
+from yatube.settings import ESTIMATE_PAGES, NUM_OF_POSTS
 
+CURSOR_SALT = 'posts.cursor'
+NEXT, PREVIOUS, LAST = 'n', 'p', 'l'
 
-def paginator(request, post_list):
-    paginator = Paginator(post_list, NUM_OF_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+
+class KeysetPaginator(Paginator):
+    """Постраничный вывод по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Страницы адресуются непрозрачными курсорами из ``?cursor=``,
+    старые ссылки ``?page=N`` обслуживаются через OFFSET. ``record``
+    превращает строки выборки в объекты страницы, например строки
+    ``values()`` в записи; ключи тогда берутся из самих строк.
+
+    Число записей ``count`` берётся из ``counter`` — функции, которая
+    читает поддерживаемый счётчик. Без неё COUNT ограничен
+    ``ESTIMATE_PAGES`` страницами: если записей больше, ``estimated``
+    говорит, что страниц «много», и точное число не считается.
+    ``counted`` — выборка для такого COUNT вместо ``object_list``,
+    если ту нельзя посчитать в подзапросе.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk'),
+                 record=None, counter=None, counted=None):
+        self.keys = keys
+        self.record = record
+        self.counter = counter
+        self.counted = counted
+        self.estimated = False
+        super().__init__(
+            object_list.order_by(*(f'-{key}' for key in keys)), per_page
+        )
+
+    @cached_property
+    def count(self):
+        if self.counter is not None:
+            return self.counter()
+        counted = self.object_list if self.counted is None else self.counted
+        limit = self.per_page * ESTIMATE_PAGES
+        count = counted.order_by()[:limit + 1].count()
+        if count > limit:
+            self.estimated = True
+            return limit
+        return count
+
+    def get_page(self, number):
+        """Страница по номеру: OFFSET-выборка на одну запись больше.
+
+        Номер за последней страницей ведёт на последнюю. Если пуста
+        и она, счётчик завышен: записи считаются заново одним COUNT.
+        """
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number < 1:
+            number = 1
+        rows = self._numbered_rows(number)
+        if not rows and number > 1:
+            last = self.num_pages
+            rows = self._numbered_rows(last) if last < number else []
+            if not rows and last > 1:
+                last = self._recount_pages()
+                rows = self._numbered_rows(last)
+            number = last
+        return self._build_page(
+            rows, number,
+            has_previous=number > 1,
+            has_next=len(rows) > self.per_page,
+        )
+
+    def _numbered_rows(self, number):
+        bottom = (number - 1) * self.per_page
+        return list(self.object_list[bottom:bottom + self.per_page + 1])
+
+    def _recount_pages(self):
+        """Число страниц по настоящему COUNT вместо счётчика."""
+        counted = self.object_list if self.counted is None else self.counted
+        self.count = counted.order_by().count()
+        self.estimated = False
+        self.__dict__.pop('num_pages', None)
+        return self.num_pages
+
+    def get_cursor_page(self, cursor):
+        """Страница по курсору; испорченный курсор ведёт на первую."""
+        try:
+            direction, values, number = signing.loads(
+                cursor, salt=CURSOR_SALT
+            )
+        except (signing.BadSignature, TypeError, ValueError):
+            return self.get_page(1)
+        if direction == NEXT:
+            rows = list(
+                self.object_list.filter(self._after(values))
+                [:self.per_page + 1]
+            )
+            return self._build_page(
+                rows, number,
+                has_previous=True,
+                has_next=len(rows) > self.per_page,
+            )
+        if direction == PREVIOUS:
+            rows = self._reversed(self.object_list.filter(
+                self._before(values)
+            ))
+            return self._build_page(
+                rows[-self.per_page:], number,
+                has_previous=len(rows) > self.per_page,
+                has_next=True,
+            )
+        return self._last_page()
+
+    def _last_page(self):
+        """Последняя страница по тем же границам, что и ``?page=N``.
+
+        На ней остаток от деления числа записей на размер страницы,
+        так что, листая назад, попадаешь на полные страницы. При оценке
+        числа записей её номер и размер неизвестны: тогда это просто
+        последние ``per_page`` записей.
+        """
+        number, size = self.num_pages, self.per_page
+        if self.estimated:
+            number = None
+        elif self.count:
+            size = self.count - (number - 1) * self.per_page
+        rows = self._reversed(self.object_list, size)
+        return self._build_page(
+            rows[-size:], number,
+            has_previous=len(rows) > size,
+            has_next=False,
+        )
+
+    def _reversed(self, object_list, size=None):
+        size = size or self.per_page
+        rows = list(object_list.reverse()[:size + 1])
+        rows.reverse()
+        return rows
+
+    def _after(self, values):
+        return self._keyset_filter(values, 'lt')
+
+    def _before(self, values):
+        return self._keyset_filter(values, 'gt')
+
+    def _keyset_filter(self, values, lookup):
+        """(k1, k2) < (v1, v2) в виде, понятном любой СУБД.
+
+        Лишнее условие k1 <= v1 даёт планировщику границу диапазона
+        по индексу: без него OR читает все строки до курсора.
+        """
+        (first_key, second_key), (first, second) = self.keys, values
+        return Q(**{f'{first_key}__{lookup}e': first}) & (
+            Q(**{f'{first_key}__{lookup}': first})
+            | Q(**{first_key: first, f'{second_key}__{lookup}': second})
+        )
+
+    def _cursor(self, direction, obj, number):
+        values = None
+        if obj is not None:
+            values = [
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in (
+                    obj[key] if isinstance(obj, dict) else getattr(obj, key)
+                    for key in self.keys
+                )
+            ]
+        return signing.dumps(
+            (direction, values, number), salt=CURSOR_SALT, compress=True
+        )
+
+    def _build_page(self, rows, number, has_previous, has_next):
+        rows = rows[:self.per_page]
+        page = Page(
+            list(map(self.record, rows)) if self.record else rows,
+            number, self
+        )
+        page.is_keyset = True
+        page.previous_cursor = page.next_cursor = page.last_cursor = None
+        page.previous_page = page.next_page = None
+        if has_previous and rows:
+            page.previous_page = number - 1 if number else None
+            page.previous_cursor = self._cursor(
+                PREVIOUS, rows[0], page.previous_page
+            )
+        if has_next and rows:
+            page.next_page = number + 1 if number else None
+            page.next_cursor = self._cursor(NEXT, rows[-1], page.next_page)
+            page.last_cursor = self._cursor(LAST, None, None)
+        return page
+
+
+def paginator(request, post_list, keys=('pub_date', 'pk'), record=None,
+              counter=None, counted=None):
+    paginator = KeysetPaginator(
+        post_list, NUM_OF_POSTS, keys, record, counter, counted
+    )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    return paginator.get_page(request.GET.get('page'))
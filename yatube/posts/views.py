@@ -1,26 +1,73 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core import db
+from core.db import retry_on_lock
+from core.replicas import read_from_replica
+from yatube.settings import PAGE_CACHE_TIMEOUT
 
+from . import counters
+from .cache import cache_page_versioned, settled, versions_etag
+from .cards import card_paginator
+from .feed import FEED_KEYS, feed_posts
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import paginator
+from .models import Comment, Follow, Group, Post, Tag, User
+from .search import SEARCH_KEYS, matching, search_posts
+from .tags import TAG_KEYS, tagged_posts
+
+
+def index_scopes(request):
+    return ('index',)
+
+
+def group_scopes(request, slug):
+    return ('users', f'group:{slug}')
+
+
+def tag_scopes(request, name, slug=None):
+    scopes = ('users', 'groups', f'tag:{name.lower()}')
+    if slug is not None:
+        scopes += (f'group:{slug}',)
+    return scopes
+
 
+def profile_scopes(request, username):
+    return ('groups', f'author:{username}')
 
-@cache_page(20, key_prefix='index_page')
+
+def post_scopes(request, post_id):
+    return ('index', f'post:{post_id}')
+
+
+def follow_scopes(request):
+    return ('index', f'feed:{request.user.pk}')
+
+
+@condition(etag_func=versions_etag(index_scopes))
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, index_scopes)
+@read_from_replica(settled(index_scopes))
 def index(request):
-    post_list = Post.objects.select_related('group').all()
-    page_obj = paginator(request, post_list)
+    page_obj = card_paginator(
+        request, Post.objects.all(), counter=counters.total_posts
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=versions_etag(group_scopes))
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, group_scopes)
+@read_from_replica(settled(group_scopes))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.select_related('group').filter(group=group)
-    page_obj = paginator(request, posts)
+    page_obj = card_paginator(
+        request, Post.objects.filter(group=group),
+        counter=lambda: group.posts_count
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -28,10 +75,47 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=versions_etag(tag_scopes))
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, tag_scopes)
+def tag_posts(request, name, slug=None):
+    tag = get_object_or_404(Tag, name=name.lower())
+    group = None
+    if slug is not None:
+        group = get_object_or_404(Group, slug=slug)
+    page_obj = card_paginator(request, tagged_posts(tag, group), TAG_KEYS)
+    context = {
+        'tag': tag,
+        'group': group,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/tag_list.html', context)
+
+
+def profile_audience(request, username):
+    """От чего у авторизованного зависит тело страницы профиля."""
+    if request.user.username == username:
+        return 'owner'
+    if Follow.objects.filter(
+        user=request.user, author__username=username
+    ).exists():
+        return 'following'
+    return 'reader'
+
+
+@condition(etag_func=versions_etag(profile_scopes))
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, profile_scopes, audience=profile_audience
+)
+@read_from_replica(settled(profile_scopes))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    page_obj = paginator(request, posts)
+    author = get_object_or_404(
+        User.objects.select_related('post_counter'),
+        username=username
+    )
+    page_obj = card_paginator(
+        request, Post.objects.filter(author=author),
+        counter=lambda: counters.author_posts(author)
+    )
     following = (request.user.is_authenticated
                  and Follow.objects.filter
                  (user=request.user, author=author).
@@ -44,13 +128,15 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=versions_etag(post_scopes))
+@read_from_replica(settled(post_scopes))
 def post_detail(request, post_id):
     form = CommentForm(request.POST or None)
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
+        Post.objects.select_related('author__post_counter', 'group'),
         pk=post_id
     )
-    comments = Comment.objects.filter(post=post)
+    comments = Comment.objects.select_related('author').filter(post=post)
     context = {
         'post': post,
         'form': form,
@@ -60,14 +146,30 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = card_paginator(
+            request, search_posts(query), SEARCH_KEYS,
+            counted=matching(query)
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     context = {'form': form}
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        db.save(post)
         return redirect('posts:profile', post.author.username)
     return render(request, 'posts/create_post.html', context)
 
@@ -83,7 +185,7 @@ def post_edit(request, post_id):
     if request.user != post.author:
         return redirect('posts:post_detail', post_id=post_id)
     if form.is_valid():
-        form.save()
+        db.save(form.save(commit=False))
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -94,6 +196,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_lock
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -106,9 +209,12 @@ def add_comment(request, post_id):
 
 
 @login_required
+@condition(etag_func=versions_etag(follow_scopes))
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request, post_list)
+    page_obj = card_paginator(
+        request, feed_posts(request.user), FEED_KEYS,
+        counter=lambda: counters.feed_posts(request.user)
+    )
     context = {
         'page_obj': page_obj,
     }
@@ -116,6 +222,7 @@ def follow_index(request):
 
 
 @login_required
+@retry_on_lock
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -127,6 +234,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_lock
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(
@@ -0,0 +1,50 @@
+"""Отправка писем через очередь задач.
+
+Запрос, который шлёт письмо, например сброс пароля, не ждёт
+почтового сервера: письмо уходит воркеру, а тот отправляет его
+бэкендом из ``TASKS_EMAIL_BACKEND``.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .models import Task
+from .queue import enqueue
+
+FIELDS = (
+    'subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+    'extra_headers',
+)
+
+
+class EmailBackend(BaseEmailBackend):
+    """Ставит письма в очередь задач.
+
+    Письма с вложениями отправляются сразу: вложения не хранятся
+    в очереди.
+    """
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if message.attachments:
+                get_connection(
+                    settings.TASKS_EMAIL_BACKEND,
+                    fail_silently=self.fail_silently,
+                ).send_messages([message])
+                continue
+            fields = {field: getattr(message, field) for field in FIELDS}
+            fields['alternatives'] = getattr(message, 'alternatives', [])
+            enqueue(deliver, fields, priority=Task.HIGH)
+        return len(email_messages)
+
+
+def deliver(fields):
+    """Отправляет письмо из очереди настоящим бэкендом."""
+    headers = fields.pop('extra_headers')
+    alternatives = [tuple(item) for item in fields.pop('alternatives')]
+    EmailMultiAlternatives(
+        headers=headers,
+        alternatives=alternatives,
+        connection=get_connection(settings.TASKS_EMAIL_BACKEND),
+        **fields,
+    ).send()
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.worker import Worker, run_processes
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди. Запускается рядом '
+        'с сервером приложения и останавливается по SIGTERM или Ctrl+C, '
+        'доделав текущие задачи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.TASKS_THREADS,
+            help='Число потоков в каждом процессе воркера'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов воркера; больше одного — для задач, '
+                 'которые упираются в процессор'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.TASKS_POLL_INTERVAL,
+            help='Пауза в секундах между проверками пустой очереди'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить готовые задачи и выйти'
+        )
+
+    def handle(self, *args, **options):
+        threads, processes = options['threads'], options['processes']
+        if threads < 1 or processes < 1:
+            raise CommandError('Нужен хотя бы один поток и один процесс')
+        if processes > 1:
+            run_processes(
+                processes, threads, options['poll_interval'],
+                options['burst']
+            )
+            return
+        worker = Worker(threads, options['poll_interval'], options['burst'])
+        worker.handle_signals()
+        worker.run()
@@ -0,0 +1,71 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Фоновая задача: вызов функции по пути импорта с аргументами."""
+    HIGH = 10
+    NORMAL = 0
+    LOW = -10
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не удалась'),
+    )
+    LIVE = (QUEUED, RUNNING)
+
+    name = models.CharField('Функция', max_length=200)
+    args = models.TextField('Аргументы в JSON', default='[]')
+    priority = models.SmallIntegerField(
+        'Приоритет',
+        default=NORMAL,
+        help_text='Задачи с большим приоритетом выполняются раньше'
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=7,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text='Пока задача с этим ключом ждёт или выполняется, '
+                  'такая же повторно не ставится'
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Предел попыток')
+    run_at = models.DateTimeField('Выполнить не раньше', default=timezone.now)
+    locked_until = models.DateTimeField(
+        'Воркер держит задачу до',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status__in=('queued', 'running')),
+                name='unique_live_task_key'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='task_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -0,0 +1,16 @@
+"""Точка входа процесса воркера, запущенного через ``spawn``.
+
+Модуль импортируется в новом процессе до настройки Django, поэтому
+сам не тянет моделей.
+"""
+
+
+def serve(threads, poll_interval, burst):
+    import django
+
+    django.setup()
+    from .worker import Worker
+
+    worker = Worker(threads, poll_interval, burst)
+    worker.handle_signals()
+    worker.run()
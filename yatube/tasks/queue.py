@@ -0,0 +1,121 @@
+"""Очередь фоновых задач в таблице базы.
+
+``enqueue`` пишет задачу в текущей транзакции запроса: если запрос
+откатится, задача пропадёт вместе с ним, а воркер увидит её только
+после коммита. Воркер (``manage.py runworker``) забирает задачи
+условным ``UPDATE``, поэтому одну задачу не выполнят двое, даже если
+воркеров несколько процессов. Задачи должны быть идемпотентными:
+после падения воркера задача, которую он держал, выполнится снова.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH = 10
+
+
+def task_name(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, priority=Task.NORMAL, key=None, delay=None,
+            max_attempts=None):
+    """Ставит ``func(*args)`` в очередь; аргументы должны быть JSON.
+
+    Пока задача с тем же ``key`` ждёт или выполняется, повторная
+    постановка ничего не делает.
+    """
+    task = Task(
+        name=task_name(func),
+        args=json.dumps(args),
+        priority=priority,
+        key=key,
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+    )
+    if delay is not None:
+        task.run_at = timezone.now() + timedelta(seconds=delay)
+    Task.objects.bulk_create([task], ignore_conflicts=True)
+
+
+def claim():
+    """Забирает самую срочную готовую задачу или возвращает ``None``."""
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at').values_list('pk', flat=True)
+    for pk in candidates[:CLAIM_BATCH]:
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.TASKS_LEASE),
+        ):
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(task):
+    """Выполняет задачу: удачная удаляется, упавшая ждёт повтора."""
+    try:
+        import_string(task.name)(*json.loads(task.args))
+    except Exception:
+        logger.exception('Задача %s не удалась', task)
+        retry(task, traceback.format_exc())
+    else:
+        Task.objects.filter(pk=task.pk, status=Task.RUNNING).delete()
+
+
+def retry(task, error):
+    """Откладывает задачу с растущей паузой или помечает неудавшейся."""
+    running = Task.objects.filter(pk=task.pk, status=Task.RUNNING)
+    if task.attempts >= task.max_attempts:
+        running.update(
+            status=Task.FAILED, locked_until=None, last_error=error
+        )
+        return
+    running.update(
+        status=Task.QUEUED,
+        locked_until=None,
+        last_error=error,
+        run_at=timezone.now() + timedelta(seconds=backoff(task.attempts)),
+    )
+
+
+def backoff(attempts):
+    """Пауза перед повтором: экспонента со случайным разбросом.
+
+    Разброс не даёт задачам, упавшим разом, разом и повториться.
+    """
+    delay = min(
+        settings.TASKS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASKS_RETRY_MAX_DELAY,
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def reclaim():
+    """Возвращает в очередь задачи воркеров, которые не отчитались.
+
+    Исчерпавшие попытки помечаются неудавшимися.
+    """
+    expired = Task.objects.filter(
+        status=Task.RUNNING, locked_until__lt=timezone.now()
+    )
+    expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED,
+        locked_until=None,
+        last_error='Воркер не завершил задачу',
+    )
+    return expired.update(status=Task.QUEUED, locked_until=None)
@@ -0,0 +1,121 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail import send_mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from tasks import queue
+from tasks.models import Task
+
+CALLS = []
+
+
+def record(*args):
+    CALLS.append(args)
+
+
+def explode():
+    raise ValueError('не вышло')
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def run_next(self):
+        task = queue.claim()
+        queue.execute(task)
+        return task
+
+    def test_enqueue_and_execute(self):
+        """Задача выполняется с аргументами и удаляется."""
+        queue.enqueue(record, 1, 'два', [3])
+        self.run_next()
+        self.assertEqual(CALLS, [(1, 'два', [3])])
+        self.assertFalse(Task.objects.exists())
+        self.assertIsNone(queue.claim())
+
+    def test_priority_order(self):
+        """Сначала выполняются задачи с большим приоритетом."""
+        queue.enqueue(record, 'low', priority=Task.LOW)
+        queue.enqueue(record, 'normal')
+        queue.enqueue(record, 'high', priority=Task.HIGH)
+        queue.enqueue(record, 'later', priority=Task.HIGH, delay=60)
+        for _ in range(3):
+            self.run_next()
+        self.assertEqual(CALLS, [('high',), ('normal',), ('low',)])
+        self.assertIsNone(queue.claim())
+
+    def test_idempotency_key(self):
+        """Живая задача с тем же ключом повторно не ставится."""
+        queue.enqueue(record, 1, key='k')
+        queue.enqueue(record, 2, key='k')
+        self.assertEqual(Task.objects.count(), 1)
+        task = queue.claim()
+        queue.enqueue(record, 3, key='k')
+        self.assertEqual(Task.objects.count(), 1)
+        queue.execute(task)
+        queue.enqueue(record, 4, key='k')
+        self.assertEqual(Task.objects.get().args, '[4]')
+
+    @override_settings(TASKS_RETRY_DELAY=10, TASKS_RETRY_MAX_DELAY=15)
+    def test_retry_with_backoff(self):
+        """Упавшая задача откладывается, а исчерпав попытки — остаётся."""
+        queue.enqueue(explode, max_attempts=2)
+        started = timezone.now()
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.run_next()
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertIn('ValueError: не вышло', task.last_error)
+        self.assertGreaterEqual(task.run_at, started + timedelta(seconds=5))
+        self.assertIsNone(queue.claim())
+        Task.objects.update(run_at=started)
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.run_next()
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+        self.assertLessEqual(queue.backoff(10), 15)
+
+    def test_reclaim_expired_lease(self):
+        """Задача упавшего воркера возвращается в очередь."""
+        queue.enqueue(record, max_attempts=2)
+        queue.claim()
+        self.assertIsNone(queue.claim())
+        Task.objects.update(locked_until=timezone.now() - timedelta(1))
+        self.assertEqual(queue.reclaim(), 1)
+        queue.claim()
+        Task.objects.update(locked_until=timezone.now() - timedelta(1))
+        queue.reclaim()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    @override_settings(
+        EMAIL_BACKEND='tasks.mail.EmailBackend',
+        TASKS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_queued_email(self):
+        """Письмо уходит воркеру и отправляется настоящим бэкендом."""
+        send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(self.run_next().priority, Task.HIGH)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
+
+
+class RunWorkerTests(TransactionTestCase):
+    def test_burst(self):
+        """Воркер в режиме burst выполняет готовые задачи и выходит."""
+        CALLS.clear()
+        for number in range(5):
+            queue.enqueue(record, number)
+        queue.enqueue(record, 'later', delay=60)
+        call_command(
+            'runworker', '--burst', '--threads=1', stdout=StringIO()
+        )
+        self.assertEqual(sorted(CALLS), [(number,) for number in range(5)])
+        self.assertEqual(Task.objects.count(), 1)
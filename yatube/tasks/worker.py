@@ -0,0 +1,96 @@
+"""Цикл воркера очереди задач: потоки в одном или нескольких процессах."""
+import logging
+import multiprocessing
+import signal
+import threading
+
+from django.db import DatabaseError, close_old_connections, connection
+
+from . import process, queue
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Потоки, которые забирают и выполняют задачи, пока не остановят.
+
+    В режиме ``burst`` потоки выходят, когда готовых задач не осталось.
+    """
+
+    def __init__(self, threads, poll_interval, burst=False):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.stop = threading.Event()
+
+    def run(self):
+        queue.reclaim()
+        connection.close()
+        workers = [
+            threading.Thread(target=self.loop, name=f'tasks-{number}')
+            for number in range(self.threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def loop(self):
+        try:
+            while not self.stop.is_set():
+                try:
+                    task = self.step()
+                except DatabaseError:
+                    # Например, база занята чужой записью: позже повторим.
+                    logger.warning('Ошибка базы в воркере', exc_info=True)
+                    task = False
+                close_old_connections()
+                if task is None and self.burst:
+                    return
+                if not task:
+                    self.stop.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def step(self):
+        """Выполняет одну задачу; ``None``, если готовых нет."""
+        task = queue.claim()
+        if task is not None:
+            queue.execute(task)
+        elif not self.burst:
+            queue.reclaim()
+        return task
+
+    def handle_signals(self):
+        """Останавливает воркер по SIGTERM и SIGINT после текущих задач."""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: self.stop.set())
+
+
+def run_processes(processes, threads, poll_interval, burst):
+    """Запускает воркеры в отдельных процессах и ждёт их завершения.
+
+    SIGTERM и SIGINT пересылаются процессам, те доделывают свои задачи.
+    """
+    context = multiprocessing.get_context('spawn')
+    children = [
+        context.Process(
+            target=process.serve,
+            args=(threads, poll_interval, burst),
+            name=f'tasks-worker-{number}',
+        )
+        for number in range(processes)
+    ]
+    connection.close()
+    for child in children:
+        child.start()
+
+    def forward(signum, frame):
+        for child in children:
+            if child.is_alive():
+                child.terminate()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, forward)
+    for child in children:
+        child.join()
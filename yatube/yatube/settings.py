@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -46,10 +50,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'tasks.apps.TasksConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.PinPrimaryMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -64,7 +71,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.templates.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,13 +92,46 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# WAL пускает читателей параллельно с писателем, synchronous = NORMAL
+# в режиме WAL не теряет целостности при сбое процесса. Соединения
+# живут между запросами, поэтому прагмы и кеш страниц SQLite
+# не пропадают с каждым запросом. Ждать занятую базу — до timeout
+# секунд, записи во вьюхах повторяются при блокировке (core.db).
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'cache_size': -16 * 1024,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
 
+# Реплики для чтения лент (core.replicas). Файл реплики обновляет
+# внешняя репликация или, для проверки, `manage.py sync_replica`;
+# чтобы читать с него, добавьте 'replica' в DATABASE_REPLICAS.
+# DATABASE_REPLICA_LAG — наибольшее отставание реплики в секундах.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+}
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_APPS = ('posts',)
+DATABASE_REPLICA_LAG = 5
+
+DATABASE_LOCK_RETRIES = 5
+DATABASE_LOCK_RETRY_DELAY = 0.05
+DATABASE_LOCK_RETRY_MAX_DELAY = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -135,7 +175,54 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 # Constants
 
 NUM_OF_POSTS = 10
+# До скольких страниц паджинатор считает записи без счётчика.
+ESTIMATE_PAGES = 10
 NUM_TEXT = 15
+# Сколько символов текста поста показывают карточки в лентах.
+EXCERPT_LENGTH = 500
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Тренды тегов считаются по почасовым корзинам в скользящем окне.
+TRENDING_HOURS = 24
+TRENDING_SIZE = 10
+
+# Миниатюры режет воркер очереди задач, страницы до этого показывают
+# заглушку. THUMBNAIL_WORKERS — потоки generate_thumbnails и пул
+# отложенной записи хранилища ключей sorl и промахов отрисовки.
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnail_kvstore.KVStore'
+THUMBNAIL_WORKERS = 4
+
+# Очередь фоновых задач (приложение tasks) выполняет отдельный процесс
+# `manage.py runworker`. Паузы и срок аренды задачи — в секундах.
+TASKS_THREADS = 4
+TASKS_POLL_INTERVAL = 1
+TASKS_LEASE = 10 * 60
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_DELAY = 10
+TASKS_RETRY_MAX_DELAY = 60 * 60
+
+# Загрузка картинок: файлы пишутся на диск, декодирование идёт
+# в отдельных процессах с ограничением памяти.
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_MAX_SIDE = 2560
+IMAGE_UPLOAD_WORKERS = 2
+IMAGE_UPLOAD_TIMEOUT = 30
+IMAGE_WORKER_MEMORY = 1024 * 1024 * 1024
+
+# Пулы потоков ASGI-приложения (yatube/asgi.py): читающие ленты
+# обслуживаются отдельно от остальных запросов.
+ASGI_WORKERS = 8
+ASGI_READ_WORKERS = 16
+ASGI_READ_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -143,7 +230,10 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 # Configuration key
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят через очередь задач, воркер отправляет их
+# бэкендом TASKS_EMAIL_BACKEND.
+EMAIL_BACKEND = 'tasks.mail.EmailBackend'
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -151,8 +241,30 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий для всех воркеров хоста кеш. Для одного процесса подойдёт
+# и 'django.core.cache.backends.locmem.LocMemCache'.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Тесты не трогают общий кеш хоста и чистят свой: он лежит во временном
+# каталоге, который через окружение достаётся и дочерним процессам.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    if 'YATUBE_TEST_CACHE_DIR' not in os.environ:
+        os.environ['YATUBE_TEST_CACHE_DIR'] = tempfile.mkdtemp(
+            prefix='yatube-cache-'
+        )
+        atexit.register(
+            shutil.rmtree, os.environ['YATUBE_TEST_CACHE_DIR'], True
+        )
+    CACHES['default']['LOCATION'] = os.path.join(
+        os.environ['YATUBE_TEST_CACHE_DIR'], 'cache.sqlite3'
+    )